@@ -0,0 +1,66 @@
+"""
+ASGI entry point next to the WSGI main:app. Flow screen requests are
+served on the event loop with their independent reads gathered, every
+other route is handed to the Flask app through asgiref's WsgiToAsgi.
+
+    gunicorn -b :$PORT -k uvicorn.workers.UvicornWorker asgi:app
+"""
+import asyncio
+import json
+
+from asgiref.wsgi import WsgiToAsgi
+
+from logger import Logger
+from main import service
+
+FLOW_PATH = "/api/flow"
+
+wsgi_app = WsgiToAsgi(service.app)
+
+
+async def read_body(receive) -> bytes:
+    body = b""
+    while True:
+        message = await receive()
+        body += message.get("body", b"")
+        if not message.get("more_body"):
+            return body
+
+
+async def send_response(send, status: int, body: str) -> None:
+    await send({
+        "type": "http.response.start",
+        "status": status,
+        "headers": [(b"content-type", b"text/plain; charset=utf-8")],
+    })
+    await send({"type": "http.response.body", "body": body.encode("utf-8")})
+
+
+async def lifespan(receive, send) -> None:
+    while True:
+        message = await receive()
+        if message["type"] == "lifespan.startup":
+            await send({"type": "lifespan.startup.complete"})
+        elif message["type"] == "lifespan.shutdown":
+            # Drain queued webhook events before flushing the writes they queue
+            if service.webhook_dispatcher:
+                await asyncio.to_thread(service.webhook_dispatcher.shutdown)
+            await asyncio.to_thread(service.profile_store.shutdown)
+            await asyncio.to_thread(service.db_service.booking_history.shutdown)
+            await send({"type": "lifespan.shutdown.complete"})
+            return
+
+
+async def app(scope, receive, send):
+    if scope["type"] == "lifespan":
+        return await lifespan(receive, send)
+    if (scope["type"] == "http" and scope["path"] == FLOW_PATH
+            and scope["method"] == "POST"):
+        try:
+            body = await service.process_flow_request_async(
+                json.loads(await read_body(receive)))
+        except Exception as e:
+            Logger.error(f"Flow request failed {e}", exc_info=True)
+            return await send_response(send, 500, "")
+        return await send_response(send, 200, body)
+    return await wsgi_app(scope, receive, send)
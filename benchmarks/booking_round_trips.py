@@ -0,0 +1,150 @@
+"""
+Round trips per booking lifecycle.
+
+Runs create_booking, get_pending_booking and confirm_booking for a number of
+bookings on an in-memory store that counts the RPCs Firestore would make:
+one per read, a BeginTransaction before the first read of a transaction,
+one Commit per transaction or batch with writes, and one per write made
+outside a transaction. Every RPC sleeps --latency-ms.
+
+Compares booking history written inline on the request thread, as a
+separate commit after the booking, with the write-behind queue that
+appends it off the critical path.
+
+    python -m benchmarks.booking_round_trips --bookings 200 --latency-ms 20
+"""
+import argparse
+import datetime
+import threading
+import time
+import uuid
+from contextlib import contextmanager
+
+from metrics import Metrics
+from service.document_repository import DocumentRepository
+from service.document_store import InMemoryStore
+
+
+class RoundTripCountingStore(InMemoryStore):
+    def __init__(self, latency_ms: float):
+        super().__init__()
+        self.latency = latency_ms / 1000
+        self.counts = {"critical": 0, "background": 0}
+        self._counts_lock = threading.Lock()
+        self._local = threading.local()
+
+    def round_trip(self):
+        path = ("background" if threading.current_thread().name.endswith("-flusher")
+                else "critical")
+        with self._counts_lock:
+            self.counts[path] += 1
+        time.sleep(self.latency)
+
+    @property
+    def _transaction(self) -> dict:
+        return getattr(self._local, "transaction", None)
+
+    @contextmanager
+    def transaction(self):
+        if self._transaction is not None:
+            yield
+            return
+        self._local.transaction = {"begun": False, "writes": False}
+        try:
+            with super().transaction():
+                yield
+            if self._transaction["writes"]:
+                self.round_trip()
+        finally:
+            self._local.transaction = None
+
+    def read(self):
+        if self._transaction is None:
+            self.round_trip()
+        elif not self._transaction["begun"]:
+            self._transaction["begun"] = True
+            self.round_trip()
+            self.round_trip()
+        else:
+            self.round_trip()
+
+    def write(self):
+        if self._transaction is None:
+            self.round_trip()
+        else:
+            self._transaction["writes"] = True
+
+    def get(self, collection: str, _id: str):
+        self.read()
+        return super().get(collection, _id)
+
+    def get_all(self, collection: str, ids):
+        self.read()
+        return super().get_all(collection, ids)
+
+    def query(self, collection: str, *args, **kwargs):
+        self.read()
+        return super().query(collection, *args, **kwargs)
+
+    def set(self, collection: str, _id: str, data: dict, merge_data=False) -> None:
+        self.write()
+        super().set(collection, _id, data, merge_data)
+
+    def create(self, collection: str, _id: str, data: dict) -> bool:
+        self.write()
+        return super().create(collection, _id, data)
+
+    def delete(self, collection: str, _id: str) -> None:
+        self.write()
+        super().delete(collection, _id)
+
+
+def book(db_service: DocumentRepository, index: int) -> float:
+    mobile = f"9196{index:08d}"
+    token = uuid.uuid4().hex
+    date = (datetime.date.today()
+            + datetime.timedelta(days=30 + index % 300)).strftime("%d %b %Y")
+    start = time.perf_counter()
+    if not db_service.create_booking(mobile, token, 1200, date, [f"D0H{index % 18}"]):
+        raise SystemExit(f"Booking {index} was refused")
+    pending_booking = db_service.get_pending_booking(token=token)
+    if not db_service.confirm_booking(pending_booking, token, "{}"):
+        raise SystemExit(f"Booking {index} could not be confirmed")
+    return (time.perf_counter() - start) * 1000
+
+
+def run(mode: str, bookings: int, latency_ms: float) -> dict:
+    store = RoundTripCountingStore(latency_ms)
+    flush_interval = 0 if mode == "inline" else 0.5
+    db_service = DocumentRepository(store, history_flush_interval=flush_interval)
+    samples = [book(db_service, index) for index in range(bookings)]
+    db_service.booking_history.shutdown()
+    counts = dict(store.counts)
+    history = len(store.query("pending_bookings_history"))
+    if history != bookings:
+        raise SystemExit(f"{mode}: {history} history entries for {bookings} bookings")
+    return {
+        "critical": counts["critical"] / bookings,
+        "background": counts["background"] / bookings,
+        "p50": Metrics.percentile(samples, 50),
+        "p99": Metrics.percentile(samples, 99),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawTextHelpFormatter)
+    parser.add_argument("--bookings", type=int, default=200)
+    parser.add_argument("--latency-ms", type=float, default=20)
+    args = parser.parse_args()
+
+    print(f"{'history':<14}{'critical rt':>12}{'background rt':>15}"
+          f"{'p50 ms':>9}{'p99 ms':>9}")
+    for mode in ("inline", "write-behind"):
+        result = run(mode, args.bookings, args.latency_ms)
+        print(f"{mode:<14}{result['critical']:>12.2f}{result['background']:>15.2f}"
+              f"{result['p50']:>9.1f}{result['p99']:>9.1f}")
+
+
+if __name__ == "__main__":
+    main()
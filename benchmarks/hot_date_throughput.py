@@ -0,0 +1,97 @@
+"""
+Sustained reservation throughput on one hot date.
+
+Concurrent users keep creating pending bookings of distinct slots on the
+same date for --duration seconds, the way a newly opened Saturday evening
+fills up. Every booking writes the date's availability, so with a single
+availability document each commit contends with all the others, with the
+date sharded by slot only bookings of the same slot do. Runs the date
+unsharded, where it is sharded automatically once it turns hot, and
+sharded up front, and reports reservations per second.
+
+    python -m benchmarks.hot_date_throughput --backend sqlite
+
+    gcloud emulators firestore start --host-port=localhost:8080
+    FIRESTORE_EMULATOR_HOST=localhost:8080 GOOGLE_CLOUD_PROJECT=cbc-load-test \\
+        python -m benchmarks.hot_date_throughput --backend firestore
+"""
+import argparse
+import datetime
+import itertools
+import os
+import random
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from metrics import Metrics
+from model.enums import DBBackend
+from service.repository import BaseRepository, RepositoryFactory
+
+
+def reserve_until(db_service: BaseRepository, date: str, user: int,
+                  deadline: float) -> dict:
+    result = {"reserved": 0, "refused": 0, "errors": 0, "samples": []}
+    for attempt in itertools.count():
+        if time.monotonic() >= deadline:
+            return result
+        start = time.perf_counter()
+        try:
+            won = db_service.create_booking(f"9195{user:08d}", uuid.uuid4().hex, 1200,
+                                            date, [f"U{user}S{attempt}"])
+            result["reserved" if won else "refused"] += 1
+        except Exception:
+            result["errors"] += 1
+        result["samples"].append((time.perf_counter() - start) * 1000)
+
+
+def run(db_service: BaseRepository, date: str, users: int, duration: float) -> dict:
+    retries = Metrics.snapshot()["counters"].get("availability.retries", 0)
+    deadline = time.monotonic() + duration
+    with ThreadPoolExecutor(max_workers=users) as executor:
+        results = list(executor.map(
+            lambda user: reserve_until(db_service, date, user, deadline), range(users)))
+    samples = [sample for result in results for sample in result["samples"]]
+    return {
+        "reserved": sum(result["reserved"] for result in results),
+        "refused": sum(result["refused"] for result in results),
+        "errors": sum(result["errors"] for result in results),
+        "retries": Metrics.snapshot()["counters"].get("availability.retries", 0)
+                   - retries,
+        "p50": Metrics.percentile(samples, 50),
+        "p99": Metrics.percentile(samples, 99),
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawTextHelpFormatter)
+    parser.add_argument("--users", type=int, default=30)
+    parser.add_argument("--duration", type=float, default=10)
+    parser.add_argument("--backend", choices=[backend.value for backend in DBBackend],
+                        default=DBBackend.MEMORY.value)
+    args = parser.parse_args()
+    if args.backend == DBBackend.FIRESTORE.value and not os.getenv(
+            "FIRESTORE_EMULATOR_HOST"):
+        parser.error("FIRESTORE_EMULATOR_HOST must point to the Firestore emulator")
+
+    db_service = RepositoryFactory.get_repository(DBBackend(args.backend))
+    # Fresh dates per run, earlier runs leave their bookings behind
+    first_day = random.randint(30, 3000)
+    print(f"{'layout':<10}{'reserved':>10}{'per sec':>10}{'refused':>9}"
+          f"{'errors':>8}{'retries':>9}{'p50 ms':>9}{'p99 ms':>9}")
+    for offset, layout in enumerate(("single", "sharded")):
+        date = (datetime.date.today()
+                + datetime.timedelta(days=first_day + offset)).strftime("%d %b %Y")
+        if layout == "sharded":
+            db_service.shard_availability(date)
+        result = run(db_service, date, args.users, args.duration)
+        print(f"{layout:<10}{result['reserved']:>10}"
+              f"{result['reserved'] / args.duration:>10.1f}{result['refused']:>9}"
+              f"{result['errors']:>8}{result['retries']:>9}"
+              f"{result['p50']:>9.1f}{result['p99']:>9.1f}")
+    db_service.booking_history.shutdown()
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,65 @@
+"""
+Micro-benchmark for outbound message serialization.
+
+Compares the previous dumps -> loads -> dumps round trip with the single
+pass model.serializable.dumps for every message type built by
+MessageBuilderService.
+
+    python -m benchmarks.message_serialization --iterations 5000
+"""
+import argparse
+import json
+import time
+
+from message_builder_service import MessageBuilderService as mbs
+from model.serializable import dumps
+from model.templates import TemplateBuilder as tb
+
+MOBILE = "919999999999"
+BODY = "Date: 01 Jan 2025\nSlots: 6 PM - 7 PM, 7 PM - 8 PM\nAmount: 2400"
+
+
+def build_messages() -> dict:
+    return {
+        "interactive": mbs.get_interactive_message(MOBILE, BODY),
+        "interactive_flow": mbs.get_interactive_flow_message(
+            MOBILE, BODY, mbs.get_initial_screen_param("flow", "token")),
+        "text": mbs.get_final_text_message(MOBILE, "", BODY),
+        "payment_link": mbs.get_interactive_payment_message(
+            MOBILE, BODY, 240000, 100, "token", payment_uri="https://rzp.io/x"),
+        "payment_gateway": mbs.get_interactive_payment_message_gw(
+            MOBILE, BODY, 240000, "token", 100),
+        "order_confirmation": mbs.get_order_confirmation_message(
+            MOBILE, BODY, "token"),
+        "template": tb.build(MOBILE, "scheduled_booking_notification",
+                             [tb.get_text_parameter("01 Jan 2025"),
+                              tb.get_text_parameter(BODY * 10)]),
+    }
+
+
+def legacy(message) -> bytes:
+    json_data = json.dumps(message, default=lambda o: o.__dict__)
+    return json.dumps(json.loads(json_data)).encode("utf-8")
+
+
+def measure(function, message, iterations: int) -> float:
+    start = time.perf_counter()
+    for _ in range(iterations):
+        function(message)
+    return (time.perf_counter() - start) / iterations * 1_000_000
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--iterations", type=int, default=5000)
+    args = parser.parse_args()
+    for name, message in build_messages().items():
+        assert json.loads(legacy(message)) == json.loads(dumps(message))
+        before = measure(legacy, message, args.iterations)
+        after = measure(dumps, message, args.iterations)
+        print(f"{name:20} round trip={before:8.2f} us  single pass={after:8.2f} us"
+              f"  speedup={before / after:5.2f}x")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,91 @@
+"""
+Contention benchmark for create_booking.
+
+Fires concurrent reservations for the same date and slot from different
+users and checks that exactly one of them wins, the rest are refused
+instead of double booking. Exits 1 if any round has no winner, more than
+one, or reservations that errored.
+
+    python -m benchmarks.reservation_contention --backend sqlite
+
+    gcloud emulators firestore start --host-port=localhost:8080
+    FIRESTORE_EMULATOR_HOST=localhost:8080 GOOGLE_CLOUD_PROJECT=cbc-load-test \\
+        python -m benchmarks.reservation_contention --backend firestore
+"""
+import argparse
+import datetime
+import os
+import random
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+from metrics import Metrics
+from model.enums import DBBackend
+from service.repository import BaseRepository, RepositoryFactory
+
+
+def reserve(db_service: BaseRepository, date: str, slot: str, index: int):
+    start = time.perf_counter()
+    try:
+        won = db_service.create_booking(f"9197{index:08d}", uuid.uuid4().hex, 1200,
+                                        date, [slot])
+        error = None
+    except Exception as e:
+        # Transactions give up after their retries under heavy contention
+        won, error = False, e
+    return won, error, (time.perf_counter() - start) * 1000
+
+
+def run_round(db_service: BaseRepository, date: str, slot: str, users: int) -> dict:
+    with ThreadPoolExecutor(max_workers=users) as executor:
+        results = list(executor.map(lambda index: reserve(db_service, date, slot, index),
+                                    range(users)))
+    winners = sum(1 for won, _, _ in results if won)
+    errors = sum(1 for _, error, _ in results if error)
+    return {
+        "winners": winners,
+        "conflicts": users - winners - errors,
+        "errors": errors,
+        "samples": [elapsed for _, _, elapsed in results],
+    }
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawTextHelpFormatter)
+    parser.add_argument("--users", type=int, default=20)
+    parser.add_argument("--rounds", type=int, default=5)
+    parser.add_argument("--backend", choices=[backend.value for backend in DBBackend],
+                        default=DBBackend.MEMORY.value)
+    args = parser.parse_args()
+    if args.backend == DBBackend.FIRESTORE.value and not os.getenv(
+            "FIRESTORE_EMULATOR_HOST"):
+        parser.error("FIRESTORE_EMULATOR_HOST must point to the Firestore emulator")
+
+    db_service = RepositoryFactory.get_repository(DBBackend(args.backend))
+    samples = []
+    double_bookings = 0
+    failed_rounds = []
+    # Fresh dates per run, earlier runs leave their bookings behind
+    first_day = random.randint(30, 3000)
+    for round_index in range(args.rounds):
+        date = (datetime.date.today()
+                + datetime.timedelta(days=first_day + round_index)).strftime("%d %b %Y")
+        result = run_round(db_service, date, f"D0H{6 + round_index}", args.users)
+        samples.extend(result["samples"])
+        double_bookings += max(0, result["winners"] - 1)
+        if result["winners"] != 1 or result["errors"]:
+            failed_rounds.append(round_index)
+        print(f"round {round_index}: winners {result['winners']}, "
+              f"conflicts {result['conflicts']}, errors {result['errors']}")
+    print(f"p50 {Metrics.percentile(samples, 50):.1f} ms, "
+          f"p99 {Metrics.percentile(samples, 99):.1f} ms, "
+          f"double bookings {double_bookings}")
+    if failed_rounds:
+        raise SystemExit(f"Rounds {failed_rounds} did not have exactly one winner "
+                         f"and no errors")
+
+
+if __name__ == "__main__":
+    main()
@@ -14,7 +14,8 @@ class PaymentFactory:
             return RazorpayPayment(
                 key_id=secrets.get("RAZORPAY_KEY_ID"),
                 key_secret=secrets.get("RAZORPAY_KEY_SECRET"),
-                webhook_secret=secrets.get("RAZORPAY_WEBHOOK_SECRET")
+                webhook_secret=secrets.get("RAZORPAY_WEBHOOK_SECRET"),
+                base_url=secrets.get("RAZORPAY_API_URL")
             )
 
 
@@ -136,7 +137,8 @@ class RazorpayPayment(BasePayment):
         key_id = kwargs.get("key_id")
         key_secret = kwargs.get("key_secret")
         self.webhook_secret = kwargs.get("webhook_secret")
-        self.client = razorpay.Client(auth=(key_id, key_secret))
+        options = {"base_url": kwargs.get("base_url")} if kwargs.get("base_url") else {}
+        self.client = razorpay.Client(auth=(key_id, key_secret), **options)
         self.client.set_app_details(
             {"title": "CBC", "version": "1.0"})
         self.payment_link_expiry_in_minutes = 16
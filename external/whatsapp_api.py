@@ -1,12 +1,53 @@
+import threading
+
 import requests
-import json
+from requests.adapters import HTTPAdapter
+from urllib3.util.retry import Retry
+
 from logger import Logger
+from metrics import Metrics
 from model.enums import Constants
+from model.serializable import dumps
+
+
+class GraphRetry(Retry):
+    """
+    GET requests are retried on read errors, 429 and 5xx. A POST whose
+    response failed may already have been delivered, so it is only retried
+    on connection errors and 429, which Graph sends before accepting it.
+    """
+
+    def is_retry(self, method: str, status_code: int,
+                 has_retry_after: bool = False) -> bool:
+        if method and method.upper() == "POST":
+            return bool(self.total) and status_code == 429
+        return super().is_retry(method, status_code, has_retry_after)
 
 
 class WhatsappApi:
-    def __init__(self, wa_api_token, mobile_id):
-        self.base_url = f"https://graph.facebook.com/v18.0/{mobile_id}"
+    """
+    Graph API client. All instances share one keep-alive session per process,
+    so every processor reuses the same pooled TLS connections to
+    graph.facebook.com instead of opening a new one per message.
+    """
+    pool_size = 10
+    connect_timeout = 3.05
+    read_timeout = 10
+    retry = GraphRetry(
+        total=3,
+        backoff_factor=0.5,
+        status_forcelist=(429, 500, 502, 503, 504),
+        allowed_methods=frozenset({"GET"}),
+        respect_retry_after_header=True,
+        raise_on_status=False
+    )
+    _session: requests.Session = None
+    _session_lock = threading.Lock()
+
+    default_api_url = "https://graph.facebook.com/v18.0"
+
+    def __init__(self, wa_api_token, mobile_id, api_url: str = None):
+        self.base_url = f"{api_url or self.default_api_url}/{mobile_id}"
         self.default_headers = {
             "Content-Type": "application/json",
             "Authorization": "Bearer {}".format(wa_api_token)
@@ -14,27 +55,70 @@ class WhatsappApi:
         self.auth_header = {
             "Authorization": "Bearer {}".format(wa_api_token)
         }
+        self.timeout = (self.connect_timeout, self.read_timeout)
+
+    @classmethod
+    def get_session(cls) -> requests.Session:
+        if cls._session:
+            return cls._session
+        with cls._session_lock:
+            if not cls._session:
+                adapter = HTTPAdapter(pool_connections=1,
+                                      pool_maxsize=cls.pool_size,
+                                      max_retries=cls.retry)
+                session = requests.Session()
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+                cls._session = session
+        return cls._session
+
+    @classmethod
+    def connection_stats(cls) -> dict:
+        stats = {"connections": 0, "requests": 0, "reused": 0}
+        if not cls._session:
+            return stats
+        pools = cls._session.get_adapter("https://").poolmanager.pools
+        for key in pools.keys():
+            pool = pools.get(key)
+            if pool:
+                stats["connections"] += pool.num_connections
+                stats["requests"] += pool.num_requests
+        stats["reused"] = max(0, stats["requests"] - stats["connections"])
+        return stats
+
+    @classmethod
+    def _record_stats(cls):
+        for name, value in cls.connection_stats().items():
+            Metrics.gauge(f"whatsapp.{name}", value)
 
-    def send_message_request(self, data, header: dict = None) -> None:
+    def send_message_request(self, data, header: dict = None) -> bool:
         headers = self.get_headers(header)
-        json_data = json.dumps(data, default=lambda o: o.__dict__)
-        Logger.info(json_data)
-        result = requests.post(url=f"{self.base_url}/messages",
-                               json=json.loads(json_data),
-                               headers=headers)
+        body = dumps(data)
+        Logger.info(body.decode("utf-8"))
+        with Metrics.timer("whatsapp.send_message"):
+            result = self.get_session().post(url=f"{self.base_url}/messages",
+                                             data=body,
+                                             headers=headers,
+                                             timeout=self.timeout)
+        self._record_stats()
         Logger.info(f"status_code={result.status_code}, response={result.text}")
+        return result.ok
 
     def get_payment_status(self, token: str):
         url = "{}/payments/{}/{}".format(
             self.base_url, Constants.PAYMENT_CONFIGURATION.value, token
         )
         Logger.info(url)
-        result = requests.get(url=url, headers=self.auth_header)
+        with Metrics.timer("whatsapp.get_payment_status"):
+            result = self.get_session().get(url=url, headers=self.auth_header,
+                                            timeout=self.timeout)
+        self._record_stats()
         return result.json()
 
     def get_headers(self, header):
         if header:
             header.update(self.auth_header)
+            header.setdefault("Content-Type", "application/json")
             return header
         else:
             return self.default_headers
@@ -0,0 +1,147 @@
+"""
+Local stand-in for the WhatsApp Graph API and Razorpay endpoints used by
+WhatsappApi and RazorpayPayment, with configurable latency and error
+injection. Point WA_API_URL and RAZORPAY_API_URL in secrets/all at it.
+
+    python -m loadtest.graph_stub --port 8081 --latency-ms 80 --error-rate 0.01
+"""
+import argparse
+import random
+import threading
+import time
+import uuid
+from collections import defaultdict
+
+from flask import Flask, request, jsonify
+
+
+class GraphStub:
+    def __init__(self, latency_ms: float = 0, jitter_ms: float = 0,
+                 error_rate: float = 0):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.app = Flask(__name__)
+        self._lock = threading.Lock()
+        self.counters = defaultdict(int)
+        self.last_messages = dict()
+        self._setup_routes()
+
+    def _setup_routes(self):
+        self.app.add_url_rule(
+            rule="/<version>/<mobile_id>/messages",
+            view_func=self.send_message,
+            methods=["POST"],
+        )
+        self.app.add_url_rule(
+            rule="/<version>/<mobile_id>/payments/<configuration>/<token>",
+            view_func=self.payment_status,
+            methods=["GET"],
+        )
+        self.app.add_url_rule(
+            rule="/v1/payment_links",
+            view_func=self.create_payment_link,
+            methods=["POST"],
+        )
+        self.app.add_url_rule(
+            rule="/v1/payment_links/",
+            view_func=self.create_payment_link,
+            endpoint="create_payment_link_slash",
+            methods=["POST"],
+        )
+        self.app.add_url_rule(
+            rule="/stub/messages/<mobile>",
+            view_func=self.get_last_message,
+            methods=["GET"],
+        )
+        self.app.add_url_rule(
+            rule="/stub/stats",
+            view_func=self.stats,
+            methods=["GET"],
+        )
+
+    def _simulate(self, route: str):
+        """
+        Sleeps for the configured latency and returns an injected error
+        response, or None when the call should succeed
+        """
+        delay = self.latency_ms + random.uniform(-self.jitter_ms, self.jitter_ms)
+        if delay > 0:
+            time.sleep(delay / 1000)
+        with self._lock:
+            self.counters[route] += 1
+            if random.random() < self.error_rate:
+                self.counters[f"{route}.error"] += 1
+                status = random.choice((429, 500, 503))
+                return jsonify({"error": {"message": "injected", "code": status}}), status
+        return None
+
+    def send_message(self, version, mobile_id):
+        error = self._simulate("messages")
+        if error:
+            return error
+        message = request.get_json(force=True)
+        with self._lock:
+            self.last_messages[message.get("to")] = message
+        return jsonify({
+            "messaging_product": "whatsapp",
+            "contacts": [{"input": message.get("to"), "wa_id": message.get("to")}],
+            "messages": [{"id": f"wamid.{uuid.uuid4().hex}"}]
+        })
+
+    def payment_status(self, version, mobile_id, configuration, token):
+        error = self._simulate("payments")
+        if error:
+            return error
+        return jsonify({
+            "payments": [{
+                "reference_id": token,
+                "status": "CAPTURED",
+                "currency": "INR",
+            }]
+        })
+
+    def create_payment_link(self):
+        error = self._simulate("payment_links")
+        if error:
+            return error
+        payload = request.get_json(force=True)
+        link_id = f"plink_{uuid.uuid4().hex[:14]}"
+        return jsonify({
+            "id": link_id,
+            "amount": payload.get("amount"),
+            "reference_id": payload.get("reference_id"),
+            "status": "created",
+            "short_url": f"{request.host_url}pay/{link_id}"
+        })
+
+    def get_last_message(self, mobile):
+        with self._lock:
+            message = self.last_messages.get(mobile)
+        return (jsonify(message), 200) if message else ("", 404)
+
+    def stats(self):
+        with self._lock:
+            return jsonify(dict(self.counters))
+
+    def serve(self, port: int):
+        self.app.run(port=port, threaded=True)
+
+    def serve_in_background(self, port: int) -> threading.Thread:
+        thread = threading.Thread(target=self.serve, args=(port,), daemon=True)
+        thread.start()
+        return thread
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__)
+    parser.add_argument("--port", type=int, default=8081)
+    parser.add_argument("--latency-ms", type=float, default=0)
+    parser.add_argument("--jitter-ms", type=float, default=0)
+    parser.add_argument("--error-rate", type=float, default=0)
+    args = parser.parse_args()
+    GraphStub(args.latency_ms, args.jitter_ms, args.error_rate).serve(args.port)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,269 @@
+"""
+End-to-end load test of the booking path through main.app.
+
+Each simulated user replays a realistic sequence: text "Hi", the
+NEW_BOOKING button, the three flow screens (encrypted with a locally
+generated key pair), the nfm_reply and the payment status webhook. Graph
+API and Razorpay calls go to loadtest.graph_stub and data to the in-memory
+repository (or SQLite, or the local Firestore emulator), so nothing leaves
+the machine.
+
+    python -m loadtest.harness --users 50 --concurrency 10
+
+    gcloud emulators firestore start --host-port=localhost:8080
+    FIRESTORE_EMULATOR_HOST=localhost:8080 GOOGLE_CLOUD_PROJECT=cbc-load-test \\
+        python -m loadtest.harness --backend firestore
+"""
+import argparse
+import datetime
+import json
+import os
+import threading
+import time
+import uuid
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+import pytz
+import requests
+
+from benchmarks.flow_crypto import generate_secrets, encrypt_request, \
+    decrypt_response
+from loadtest.graph_stub import GraphStub
+from metrics import Metrics
+from model.enums import DBBackend
+from service.document_repository import DocumentRepository
+from service.repository import RepositoryFactory
+
+FLOW_TOKEN_TIMEOUT = 5
+
+
+def seed(stub_url: str, secrets: dict) -> None:
+    """
+    Writes secrets, slots and notification numbers into the configured
+    repository
+    """
+    writes = [("secrets", "all", secrets | {
+        "WA_API_TOKEN": "load-test",
+        "MOBILE_ID": "load-test",
+        "WA_API_URL": f"{stub_url}/v18.0",
+        "RAZORPAY_API_URL": stub_url,
+        "RAZORPAY_KEY_ID": "rzp_test",
+        "RAZORPAY_KEY_SECRET": "secret",
+        "JOB_KEY_SECRET": "load-test",
+        "FLOW_ID": "load-test",
+        "CBC_TEST_NUMBERS": [],
+    })]
+    for day in range(0, 7):
+        for hour in range(6, 24):
+            slot_id = f"D{day}H{hour}"
+            writes.append(("slots", slot_id, {
+                "id": slot_id,
+                "day_id": day,
+                "title": f"{hour}:00 - {hour + 1}:00",
+                "price": 1200 if hour >= 18 else 800,
+                "start_hour": hour,
+                "end_hour": hour + 1,
+                "sort_order": hour,
+                "active": True,
+            }))
+    for index in range(3):
+        writes.append(("booking_notification_numbers", str(index), {
+            "number": f"91000000000{index}",
+            "active": True,
+            "new_booking": True,
+            "scheduled": True,
+        }))
+    repository = RepositoryFactory.get_repository()
+    if isinstance(repository, DocumentRepository):
+        for collection, _id, data in writes:
+            repository.store.set(collection, _id, data)
+        return
+    batch = repository.db.batch()
+    for collection, _id, data in writes:
+        batch.set(repository.db.collection(collection).document(_id), data)
+    batch.commit()
+
+
+class Recorder:
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.samples = defaultdict(list)
+        self.errors = defaultdict(int)
+
+    def record(self, route: str, elapsed_ms: float, ok: bool):
+        with self._lock:
+            self.samples[route].append(elapsed_ms)
+            if not ok:
+                self.errors[route] += 1
+
+    def report(self, duration_s: float):
+        print(f"{'route':24} {'count':>6} {'errors':>6} {'rps':>8} "
+              f"{'p50 ms':>8} {'p95 ms':>8} {'p99 ms':>8}")
+        for route, samples in self.samples.items():
+            print(f"{route:24} {len(samples):6} {self.errors[route]:6} "
+                  f"{len(samples) / duration_s:8.2f} "
+                  f"{Metrics.percentile(samples, 50):8.1f} "
+                  f"{Metrics.percentile(samples, 95):8.1f} "
+                  f"{Metrics.percentile(samples, 99):8.1f}")
+
+
+class BookingUser:
+    def __init__(self, client, stub_url: str, public_key, recorder: Recorder,
+                 mobile: str, days_ahead: int):
+        self.client = client
+        self.stub_url = stub_url
+        self.public_key = public_key
+        self.recorder = recorder
+        self.mobile = mobile
+        self.days_ahead = days_ahead
+
+    def post(self, route: str, path: str, body: dict):
+        start = time.perf_counter()
+        response = self.client.post(path, json=body)
+        self.recorder.record(route, (time.perf_counter() - start) * 1000,
+                             response.status_code == 200)
+        return response
+
+    def webhook(self, route: str, value: dict):
+        return self.post(route, "/api/webhook", {
+            "object": "whatsapp_business_account",
+            "entry": [{"id": "load-test", "changes": [{
+                "field": "messages",
+                "value": {"messaging_product": "whatsapp"} | value
+            }]}]
+        })
+
+    def message(self, message_type: str, content: dict) -> dict:
+        return {
+            "contacts": [{"profile": {"name": f"User {self.mobile[-4:]}"},
+                          "wa_id": self.mobile}],
+            "messages": [{
+                "from": self.mobile,
+                "id": f"wamid.{uuid.uuid4().hex}",
+                "timestamp": str(int(time.time())),
+                "type": message_type,
+            } | content]
+        }
+
+    def flow(self, route: str, screen: str, token: str, data: dict) -> dict:
+        body, aes_key, iv = encrypt_request(self.public_key, {
+            "version": "3.0",
+            "action": "data_exchange",
+            "screen": screen,
+            "flow_token": token,
+            "data": data,
+        })
+        response = self.post(route, "/api/flow", body)
+        return decrypt_response(response.get_data(as_text=True), aes_key, iv)
+
+    def flow_token(self) -> str:
+        deadline = time.monotonic() + FLOW_TOKEN_TIMEOUT
+        while time.monotonic() < deadline:
+            message = requests.get(f"{self.stub_url}/stub/messages/{self.mobile}")
+            if message.ok and message.json().get("interactive", {}).get("type") == "flow":
+                return message.json()["interactive"]["action"]["parameters"]["flow_token"]
+            time.sleep(0.05)
+        raise TimeoutError(f"No flow message sent to {self.mobile}")
+
+    def run(self):
+        self.webhook("webhook:text", self.message("text", {"text": {"body": "Hi"}}))
+        self.webhook("webhook:new_booking", self.message("interactive", {
+            "interactive": {"type": "button_reply", "button_reply": {
+                "id": "NEW_BOOKING", "title": "New Booking"}}
+        }))
+        token = self.flow_token()
+        date = (datetime.datetime.now(pytz.timezone("Asia/Kolkata"))
+                + datetime.timedelta(days=self.days_ahead))
+        slots = self.flow("flow:date_selection", "DATE_SELECTION", token, {
+            "selected_date": str(int(date.timestamp() * 1000))
+        }).get("data")
+        available = [slot["id"] for slot in slots.get("slots", []) if slot["enabled"]]
+        if not available:
+            return
+        confirmation = self.flow("flow:slot_selection", "SLOT_SELECTION", token, {
+            "selected_date": slots["selected_date"],
+            "slots": available[:1],
+        }).get("data")
+        if not confirmation.get("amount"):
+            return
+        self.flow("flow:booking_confirmation", "BOOKING_CONFIRMATION", token, {
+            "selected_date": confirmation["selected_date"],
+            "slots": confirmation["slots"],
+            "amount": confirmation["amount"],
+        })
+        self.webhook("webhook:nfm_reply", self.message("interactive", {
+            "interactive": {"type": "nfm_reply", "nfm_reply": {
+                "name": "flow",
+                "body": "Sent",
+                "response_json": json.dumps({
+                    "success": "true",
+                    "token": token,
+                    "selected_date": confirmation["selected_date"],
+                    "slots": confirmation["slots"],
+                    "amount": confirmation["amount"],
+                })
+            }}
+        }))
+        self.webhook("webhook:payment_status", {"statuses": [{
+            "id": f"wamid.{uuid.uuid4().hex}",
+            "status": "captured",
+            "timestamp": str(int(time.time())),
+            "recipient_id": self.mobile,
+            "type": "payment",
+            "payment": {
+                "reference_id": token,
+                "amount": {"value": 120000, "offset": 100},
+                "currency": "INR",
+                "transaction": {"id": uuid.uuid4().hex, "type": "razorpay",
+                                "status": "success"}
+            }
+        }]})
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawTextHelpFormatter)
+    parser.add_argument("--users", type=int, default=50)
+    parser.add_argument("--concurrency", type=int, default=10)
+    parser.add_argument("--stub-port", type=int, default=8081)
+    parser.add_argument("--latency-ms", type=float, default=50)
+    parser.add_argument("--jitter-ms", type=float, default=20)
+    parser.add_argument("--error-rate", type=float, default=0)
+    parser.add_argument("--backend", choices=[backend.value for backend in DBBackend],
+                        default=DBBackend.MEMORY.value)
+    args = parser.parse_args()
+    if args.backend == DBBackend.FIRESTORE.value and not os.getenv(
+            "FIRESTORE_EMULATOR_HOST"):
+        parser.error("FIRESTORE_EMULATOR_HOST must point to the Firestore emulator")
+    os.environ["DB_BACKEND"] = args.backend
+
+    stub_url = f"http://127.0.0.1:{args.stub_port}"
+    GraphStub(args.latency_ms, args.jitter_ms, args.error_rate) \
+        .serve_in_background(args.stub_port)
+    secrets, public_key = generate_secrets()
+    seed(stub_url, secrets)
+
+    # Imported after seeding, BoxBooking loads secrets and slots on import
+    # and shares the seeded repository
+    from main import app
+
+    client = app.test_client()
+    recorder = Recorder()
+    users = [BookingUser(client, stub_url, public_key, recorder,
+                         f"9198{index:08d}", 1 + index % 27)
+             for index in range(args.users)]
+    start = time.perf_counter()
+    with ThreadPoolExecutor(max_workers=args.concurrency) as executor:
+        for future in [executor.submit(user.run) for user in users]:
+            try:
+                future.result()
+            except Exception as e:
+                recorder.record("user:failed", 0, False)
+                print(f"User failed: {e}")
+    recorder.report(time.perf_counter() - start)
+    print(requests.get(f"{stub_url}/stub/stats").json())
+
+
+if __name__ == "__main__":
+    main()
@@ -1,35 +1,71 @@
+import functools
 import json
+from concurrent.futures import ThreadPoolExecutor
+
 from flask import Flask, request, abort, render_template
 
 from external.payment import PaymentFactory
-from service.db import DBService
 from service.encryption_service import Encryption
 from model.enums import MessageType, Screen, PaymentProvider
+from service.repository import RepositoryFactory
 from model.flow import FlowRequest
 from model.exceptions import InvalidStateException
 from logger import Logger
+from metrics import Metrics
+from service.base_message_processor import Catalog
 from service.message_processor import MessageFactory, BaseMessageProcessor
+from service.deduplication import MessageDeduplicator
+from service.expiry import PendingBookingExpiry
 from service.flow_processing import FlowFactory
 from service.notification_processor import NotificationProcessor
 from service.payment_processor import PaymentProcessor
+from service.profile_store import ProfileWriteBehind
+from service.unit_of_work import UnitOfWork
+from service.webhook_dispatcher import WebhookDispatcher, WebhookEvent
 
 
 class BoxBooking:
 
     def __init__(self):
-        self.db_service = DBService()
-        self.secrets = self.db_service.get_all_secrets()
+        self.db_service = RepositoryFactory.get_repository()
+        self.catalog = Catalog(self.db_service)
         self.app = Flask(__name__)
         self._setup_routes()
-        self.encryption_service = Encryption(secrets=self.secrets)
+        self.encryption_service = Encryption(catalog=self.catalog)
         payment_service = PaymentFactory.get_payment_service(
             payment_provider=PaymentProvider.RAZORPAY,
             secrets=self.secrets
         )
-        self.flow_factory = FlowFactory(self.db_service)
-        self.message_factory = MessageFactory(self.db_service, payment_service)
-        self.payment_processor = PaymentProcessor(self.db_service, payment_service)
-        self.notification_processor = NotificationProcessor(self.db_service)
+        self.flow_factory = FlowFactory(
+            self.db_service, self.catalog,
+            RepositoryFactory.get_async_repository(self.db_service))
+        self.profile_store = ProfileWriteBehind(
+            self.db_service,
+            flush_interval=float(self.secrets.get("PROFILE_FLUSH_INTERVAL") or 30)
+        )
+        self.message_factory = MessageFactory(self.db_service, self.catalog,
+                                              payment_service, self.profile_store)
+        self.notification_processor = NotificationProcessor(self.db_service,
+                                                            self.catalog)
+        self.payment_processor = PaymentProcessor(self.db_service, self.catalog,
+                                                  payment_service,
+                                                  self.notification_processor)
+        self.deduplicator = MessageDeduplicator(self.db_service)
+        self.pending_expiry = PendingBookingExpiry(self.db_service)
+        self.batch_executor = ThreadPoolExecutor(
+            max_workers=int(self.secrets.get("WEBHOOK_BATCH_CONCURRENCY") or 4),
+            thread_name_prefix="webhook-batch"
+        )
+        self.webhook_dispatcher = None
+        if self.secrets.get("WEBHOOK_PROCESSING_MODE") == "async":
+            self.webhook_dispatcher = WebhookDispatcher(
+                workers=int(self.secrets.get("WEBHOOK_WORKERS") or 4),
+                max_queue_size=int(self.secrets.get("WEBHOOK_QUEUE_SIZE") or 100)
+            )
+
+    @property
+    def secrets(self) -> dict:
+        return self.catalog.secrets
 
     def _setup_routes(self):
         self.app.add_url_rule(
@@ -96,11 +132,23 @@ class BoxBooking:
             methods=["POST"],
         )
 
+        self.app.add_url_rule(
+            rule="/api/metrics",
+            view_func=self.metrics,
+            endpoint="metrics",
+            methods=["GET"],
+        )
+
+    def metrics(self):
+        if self.secrets.get("JOB_KEY_SECRET") != request.headers.get("X-Auth-Token"):
+            return abort(401)
+        return json.dumps(Metrics.snapshot()), 200
+
     def remove_pending_bookings(self):
         if self.secrets.get("JOB_KEY_SECRET") != request.headers.get("X-Auth-Token"):
             return abort(401)
-        self.db_service.remove_pending_bookings()
-        return "OK", 200
+        report = self.pending_expiry.run()
+        return str(report), 200
 
     def upcoming_booking_notification(self):
         if self.secrets.get("JOB_KEY_SECRET") != request.headers.get("X-Auth-Token"):
@@ -143,47 +191,140 @@ class BoxBooking:
                 }
             }
             return json.dumps(response), 200
-        if (request_body.get("entry") and
-                request_body.get("entry")[0] and
-                request_body.get("entry")[0].get("changes") and
-                request_body.get("entry")[0].get("changes")[0].get("value")
-        ):
-            webhook_message = request_body.get("entry")[0].get("changes")[0].get(
-                "value")
-            if webhook_message.get("messages"):
-                messages = webhook_message.get("messages")[0]
-                contact = webhook_message.get("contacts")[0] if webhook_message.get(
-                    "contacts") else None
-                message_type = MessageType(messages.get("type"))
-                # NFM_REPLY
-                if (message_type == MessageType.INTERACTIVE
-                        and messages.get("interactive").get("type")
-                        == MessageType.NFM_REPLY.value):
-                    message_type = MessageType.NFM_REPLY
-                parsed_message = BaseMessageProcessor.parse_message(messages,
-                                                                    message_type)
-                return self.message_factory.process(
-                    parsed_message,
-                    message_type,
-                    contact=contact
-                )
-            elif webhook_message.get("statuses"):
-                messages = webhook_message.get("statuses")[0]
-                message_type = MessageType(messages.get("type"))
-                parsed_message = BaseMessageProcessor.parse_message(messages,
-                                                                    message_type)
-                if message_type == MessageType.PAYMENT:
-                    return self.payment_processor.validate_status(parsed_message)
-                else:
-                    Logger.debug("Message type not yet handled")
-            else:
-                Logger.debug("Message type not yet handled")
-        return "Message type not supported", 200
+        events = self.parse_webhook_events(request_body)
+        if not events:
+            Logger.debug("Message type not yet handled")
+            return "Message type not supported", 200
+        if not self.process_events(events):
+            return "", 500
+        return "", 200
+
+    def parse_webhook_events(self, request_body) -> list[WebhookEvent]:
+        """
+        Walks every entry, change, message and status of a webhook delivery in
+        one pass. Items that cannot be parsed are logged and skipped.
+        """
+        events = list()
+        for entry in request_body.get("entry") or []:
+            for change in entry.get("changes") or []:
+                value = change.get("value") or {}
+                contacts = value.get("contacts") or []
+                for message in value.get("messages") or []:
+                    try:
+                        events.append(self.parse_message_event(message, contacts))
+                    except Exception as e:
+                        Logger.error(f"Unable to parse message {message} {e}")
+                for status in value.get("statuses") or []:
+                    try:
+                        event = self.parse_status_event(status)
+                    except Exception as e:
+                        Logger.error(f"Unable to parse status {status} {e}")
+                        continue
+                    if event:
+                        events.append(event)
+                    else:
+                        Logger.debug("Message type not yet handled")
+        return events
+
+    def parse_message_event(self, message, contacts) -> WebhookEvent:
+        contact = next((c for c in contacts if c.get("wa_id") == message.get("from")),
+                       contacts[0] if len(contacts) == 1 else None)
+        message_type = MessageType(message.get("type"))
+        # NFM_REPLY
+        if (message_type == MessageType.INTERACTIVE
+                and message.get("interactive").get("type")
+                == MessageType.NFM_REPLY.value):
+            message_type = MessageType.NFM_REPLY
+        parsed_message = BaseMessageProcessor.parse_message(message, message_type)
+        return WebhookEvent(
+            event_id=message.get("id"),
+            user=message.get("from"),
+            handler=self.message_factory.process,
+            args=(parsed_message, message_type),
+            kwargs={"contact": contact}
+        )
+
+    def parse_status_event(self, status) -> WebhookEvent:
+        message_type = MessageType(status.get("type"))
+        if message_type != MessageType.PAYMENT:
+            return None
+        parsed_message = BaseMessageProcessor.parse_message(status, message_type)
+        return WebhookEvent(
+            event_id=f"{status.get('id')}:{status.get('status')}",
+            user=status.get("recipient_id"),
+            handler=self.payment_processor.validate_status,
+            args=(parsed_message,)
+        )
+
+    def process_events(self, events: list[WebhookEvent]) -> bool:
+        """
+        Runs each user's events in order while different users are processed
+        concurrently, either on the background workers when async processing
+        is enabled or on the batch executor. Returns False when any event
+        failed, so Meta redelivers the batch and only the failed (released)
+        events are processed again.
+        """
+        user_events: dict[str, list[WebhookEvent]] = dict()
+        for event in events:
+            user_events.setdefault(event.user, list()).append(event)
+        work = [functools.partial(self.process_user_events, user_event)
+                for user_event in user_events.values()]
+        if self.webhook_dispatcher:
+            work = [w for w in work if not self.webhook_dispatcher.submit(w)]
+        if len(work) <= 1:
+            return all(w() for w in work)
+        return all(self.batch_executor.map(lambda w: w(), work))
+
+    def process_user_events(self, events: list[WebhookEvent]) -> bool:
+        """
+        Claims and processes each event in turn, redelivered events are
+        dropped. An event whose claim or processing fails is released, so its
+        redelivery is processed again.
+        """
+        success = True
+        for event in events:
+            try:
+                if self.deduplicator.is_duplicate(event.event_id):
+                    continue
+                with UnitOfWork("webhook"):
+                    event.handler(*event.args, **event.kwargs)
+            except Exception as e:
+                success = False
+                Metrics.increment("webhook.event_errors")
+                Logger.error(f"Processing webhook event {event.event_id} failed {e}",
+                             exc_info=True)
+                self.deduplicator.release(event.event_id)
+        return success
 
     def process_flow_request(self):
-        encrypted_flow_data_b64 = request.json.get("encrypted_flow_data")
-        encrypted_aes_key_b64 = request.json.get("encrypted_aes_key")
-        initial_vector_b64 = request.json.get("initial_vector")
+        json_data, key, iv = self.decrypt_flow_request(request.json)
+        if json_data.get("action") == "ping":
+            response_data = self.flow_ping_response()
+        else:
+            flow_request = FlowRequest(**json_data)
+            with UnitOfWork("flow"):
+                response_data = self.flow_factory.process(
+                    flow_request, Screen(flow_request.screen))
+        return self.encrypt_flow_response(response_data, key, iv)
+
+    async def process_flow_request_async(self, request_body: dict) -> str:
+        """
+        Same as process_flow_request with the screen's independent reads
+        gathered, served by the ASGI entry point in asgi.py
+        """
+        json_data, key, iv = self.decrypt_flow_request(request_body)
+        if json_data.get("action") == "ping":
+            response_data = self.flow_ping_response()
+        else:
+            flow_request = FlowRequest(**json_data)
+            response_data = await self.flow_factory.process_async(
+                flow_request, Screen(flow_request.screen))
+        return self.encrypt_flow_response(response_data, key, iv)
+
+    def decrypt_flow_request(self, request_body: dict):
+        encrypted_flow_data_b64 = request_body.get("encrypted_flow_data")
+        encrypted_aes_key_b64 = request_body.get("encrypted_aes_key")
+        initial_vector_b64 = request_body.get("initial_vector")
         try:
             decrypted_data, key, iv = self.encryption_service.decrypt_data(
                 encrypted_flow_data_b64,
@@ -193,17 +334,18 @@ class BoxBooking:
             Logger.error("Encryption error {}".format(e))
             raise InvalidStateException("Invalid data provided")
         Logger.info(f"Flow request: {json_data}")
-        if json_data.get("action") == "ping":
-            response_data = {
-                "version": "3.0",
-                "data": {
-                    "status": "active"
-                }
+        return json_data, key, iv
+
+    @staticmethod
+    def flow_ping_response() -> dict:
+        return {
+            "version": "3.0",
+            "data": {
+                "status": "active"
             }
-        else:
-            flow_request = FlowRequest(**json_data)
-            response_data = self.flow_factory.process(
-                flow_request, Screen(flow_request.screen))
+        }
+
+    def encrypt_flow_response(self, response_data, key, iv) -> str:
         response = json.dumps(response_data, indent=4, default=lambda o: o.__dict__)
         return self.encryption_service.encrypt_data(response, key, iv)
 
@@ -215,7 +357,8 @@ class BoxBooking:
         header = request.headers.get("X-Razorpay-Signature")
         response = request.data.decode()
         Logger.info(f"{header} \n {response}")
-        self.payment_processor.validate_payment_response(header, response)
+        with UnitOfWork("razorpay"):
+            self.payment_processor.validate_payment_response(header, response)
         return "", 200
 
     def process_razorpay_callback(self):
@@ -64,6 +64,30 @@ _Enjoy the game!_
         message.interactive = interactive
         return message
 
+    @staticmethod
+    def get_view_more_bookings_message(mobile: str, message_body: str,
+                                       cursor: str) -> im.InteractiveMessage:
+        action = im.Action()
+        action.buttons = [im.Button(reply=im.Reply(
+            id=f"{InteractiveRequestType.VIEW_BOOKING_MORE.value}:{cursor}",
+            title="Show more"
+        ))]
+
+        body = im.Body()
+        body.text = message_body
+
+        interactive = im.Interactive()
+        interactive.type = "button"
+        interactive.body = body
+        interactive.action = action
+
+        message = im.InteractiveMessage()
+        message.to = mobile
+        message.type = "interactive"
+        message.messaging_product = "whatsapp"
+        message.interactive = interactive
+        return message
+
     @staticmethod
     def get_interactive_flow_message(mobile: str,
                                      message_body: str,
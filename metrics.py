@@ -0,0 +1,95 @@
+import threading
+import time
+from collections import deque
+from contextlib import contextmanager
+
+_lock = threading.Lock()
+_counters: dict[str, int] = dict()
+_gauges: dict[str, float] = dict()
+_timings: dict[str, dict] = dict()
+_distributions: dict[str, dict] = dict()
+_SAMPLE_SIZE = 1024
+
+
+class Metrics:
+    @staticmethod
+    def increment(name: str, value: int = 1) -> None:
+        with _lock:
+            _counters[name] = _counters.get(name, 0) + value
+
+    @staticmethod
+    def gauge(name: str, value: float) -> None:
+        with _lock:
+            _gauges[name] = value
+
+    @staticmethod
+    def timing(name: str, value_ms: float) -> None:
+        Metrics._record(_timings, name, value_ms)
+
+    @staticmethod
+    def observe(name: str, value: float) -> None:
+        """
+        Records a sample of a value that is not a duration, like a count per
+        request
+        """
+        Metrics._record(_distributions, name, value)
+
+    @staticmethod
+    def _record(series: dict[str, dict], name: str, value: float) -> None:
+        with _lock:
+            stats = series.get(name)
+            if not stats:
+                stats = {"count": 0, "total": 0.0, "max": 0.0,
+                         "samples": deque(maxlen=_SAMPLE_SIZE)}
+                series[name] = stats
+            stats["count"] += 1
+            stats["total"] += value
+            stats["max"] = max(stats["max"], value)
+            stats["samples"].append(value)
+
+    @staticmethod
+    @contextmanager
+    def timer(name: str):
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            Metrics.timing(name, (time.perf_counter() - start) * 1000)
+
+    @staticmethod
+    def percentile(samples: list[float], percent: float) -> float:
+        if not samples:
+            return 0.0
+        ordered = sorted(samples)
+        index = min(len(ordered) - 1, int(round(percent / 100 * (len(ordered) - 1))))
+        return ordered[index]
+
+    @staticmethod
+    def snapshot() -> dict:
+        with _lock:
+            timings = {
+                name: {
+                    "count": t["count"],
+                    "avg_ms": round(t["total"] / t["count"], 3) if t["count"] else 0,
+                    "max_ms": round(t["max"], 3),
+                    "p50_ms": round(Metrics.percentile(list(t["samples"]), 50), 3),
+                    "p99_ms": round(Metrics.percentile(list(t["samples"]), 99), 3),
+                }
+                for name, t in _timings.items()
+            }
+            distributions = {
+                name: {
+                    "count": d["count"],
+                    "avg": round(d["total"] / d["count"], 3) if d["count"] else 0,
+                    "max": round(d["max"], 3),
+                    "p50": round(Metrics.percentile(list(d["samples"]), 50), 3),
+                    "p99": round(Metrics.percentile(list(d["samples"]), 99), 3),
+                }
+                for name, d in _distributions.items()
+            }
+            return {
+                "counters": dict(_counters),
+                "gauges": dict(_gauges),
+                "timings": timings,
+                "distributions": distributions
+            }
@@ -3,6 +3,7 @@ import enum
 
 class InteractiveRequestType(enum.Enum):
     VIEW_BOOKING = "VIEW_BOOKING"
+    VIEW_BOOKING_MORE = "VIEW_BOOKING_MORE"
     NEW_BOOKING = "NEW_BOOKING"
     CANCEL_BOOKING = "CANCEL_BOOKING"
 
@@ -76,5 +77,11 @@ class PaymentProvider(enum.Enum):
     RAZORPAY = "razor_pay"
 
 
+class DBBackend(enum.Enum):
+    FIRESTORE = "firestore"
+    MEMORY = "memory"
+    SQLITE = "sqlite"
+
+
 class Constants(enum.Enum):
     PAYMENT_CONFIGURATION = "cbc_razorpay_20240829"
@@ -1,9 +1,11 @@
 from dataclasses import dataclass
 from typing import List
 
+from model.serializable import Serializable
+
 
 @dataclass
-class Parameter:
+class Parameter(Serializable):
     flow_message_version: str
     mode: str
     flow_token: str
@@ -29,7 +31,7 @@ class Parameter:
 
 
 @dataclass
-class Action:
+class Action(Serializable):
     name: str
     parameters: Parameter
 
@@ -39,7 +41,7 @@ class Action:
 
 
 @dataclass
-class Body:
+class Body(Serializable):
     text: str
 
     def __init__(self, text: str = None) -> None:
@@ -47,7 +49,7 @@ class Body:
 
 
 @dataclass
-class Header:
+class Header(Serializable):
     type: str
     text: str
 
@@ -57,7 +59,7 @@ class Header:
 
 
 @dataclass
-class Interactive:
+class Interactive(Serializable):
     type: str
     header: Header
     body: Body
@@ -72,7 +74,7 @@ class Interactive:
 
 
 @dataclass
-class InteractiveFlowMessage:
+class InteractiveFlowMessage(Serializable):
     recipient_type: str
     messaging_product: str
     to: str
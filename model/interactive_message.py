@@ -1,7 +1,9 @@
 from dataclasses import dataclass
 
+from model.serializable import Serializable
 
-class Reply:
+
+class Reply(Serializable):
     id: str
     title: str
 
@@ -10,7 +12,7 @@ class Reply:
         self.title = title
 
 @dataclass
-class Button:
+class Button(Serializable):
     type: str
     reply: Reply
 
@@ -22,7 +24,7 @@ class Button:
 
 
 @dataclass
-class Action:
+class Action(Serializable):
     buttons: list[Button]
 
     def __init__(self, buttons: list[Button] = None) -> None:
@@ -30,7 +32,7 @@ class Action:
 
 
 @dataclass
-class Body:
+class Body(Serializable):
     text: str
 
     def __init__(self, text: str = None) -> None:
@@ -38,7 +40,7 @@ class Body:
 
 
 @dataclass
-class Header:
+class Header(Serializable):
     type: str
     text: str
 
@@ -48,7 +50,7 @@ class Header:
 
 
 @dataclass
-class Interactive:
+class Interactive(Serializable):
     type: str
     header: Header
     body: Body
@@ -63,7 +65,7 @@ class Interactive:
 
 
 @dataclass
-class InteractiveMessage:
+class InteractiveMessage(Serializable):
     messaging_product: str
     to: str
     type: str
@@ -1,7 +1,9 @@
 from typing import Optional, List
 
+from model.serializable import Serializable
 
-class Tax:
+
+class Tax(Serializable):
     value: int
     offset: int
     description: str
@@ -13,7 +15,7 @@ class Tax:
         self.description = description
 
 
-class Discount:
+class Discount(Serializable):
     value: int
     offset: int
     description: str
@@ -27,7 +29,7 @@ class Discount:
         self.discount_program_name = discount_program_name
 
 
-class Expiration:
+class Expiration(Serializable):
     timestamp: str
     description: str
 
@@ -36,7 +38,7 @@ class Expiration:
         self.description = description
 
 
-class TotalAmount:
+class TotalAmount(Serializable):
     value: int
     offset: int
 
@@ -45,7 +47,7 @@ class TotalAmount:
         self.offset = offset
 
 
-class ImporterAddress:
+class ImporterAddress(Serializable):
     address_line1: str
     address_line2: str
     city: str
@@ -65,7 +67,7 @@ class ImporterAddress:
         self.country_code = country_code
 
 
-class Item:
+class Item(Serializable):
     retailer_id: int
     name: str
     amount: TotalAmount
@@ -93,7 +95,7 @@ class Item:
         self.importer_address = importer_address
 
 
-class Order:
+class Order(Serializable):
     status: str
     expiration: Expiration
     items: List[Item]
@@ -122,14 +124,14 @@ class Order:
         self.discount = discount
 
 
-class PaymentLink:
+class PaymentLink(Serializable):
     uri: str
 
     def __init__(self, uri: str = None) -> None:
         self.uri = uri
 
 
-class PaymentSetting:
+class PaymentSetting(Serializable):
     type: str
     payment_link: PaymentLink
 
@@ -139,7 +141,7 @@ class PaymentSetting:
         self.payment_link = payment_link
 
 
-class Parameters:
+class Parameters(Serializable):
     reference_id: str
     type: str
     payment_type: str
@@ -161,7 +163,7 @@ class Parameters:
         self.order = order
 
 
-class Action:
+class Action(Serializable):
     name: str
     parameters: Parameters
 
@@ -170,14 +172,14 @@ class Action:
         self.parameters = parameters
 
 
-class Body:
+class Body(Serializable):
     text: str
 
     def __init__(self, text: str) -> None:
         self.text = text
 
 
-class Header:
+class Header(Serializable):
     type: str
     text: str
 
@@ -186,7 +188,7 @@ class Header:
         self.text = text
 
 
-class Interactive:
+class Interactive(Serializable):
     type: str
     header: Header
     body: Body
@@ -202,7 +204,7 @@ class Interactive:
         self.action = action
 
 
-class InteractivePaymentMessage:
+class InteractivePaymentMessage(Serializable):
     messaging_product: str
     to: str
     type: str
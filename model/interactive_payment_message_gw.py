@@ -1,9 +1,10 @@
 from typing import Optional, List
 
 from model.enums import Constants
+from model.serializable import Serializable
 
 
-class Tax:
+class Tax(Serializable):
     value: int
     offset: int
     description: str
@@ -14,7 +15,7 @@ class Tax:
         self.description = description
 
 
-class Discount:
+class Discount(Serializable):
     value: int
     offset: int
     description: str
@@ -28,7 +29,7 @@ class Discount:
         self.discount_program_name = discount_program_name
 
 
-class ImporterAddress:
+class ImporterAddress(Serializable):
     address_line1: str
     address_line2: str
     city: str
@@ -48,7 +49,7 @@ class ImporterAddress:
         self.country_code = country_code
 
 
-class Expiration:
+class Expiration(Serializable):
     timestamp: str
     description: str
 
@@ -57,7 +58,7 @@ class Expiration:
         self.description = description
 
 
-class TotalAmount:
+class TotalAmount(Serializable):
     value: int
     offset: int
 
@@ -66,7 +67,7 @@ class TotalAmount:
         self.offset = offset
 
 
-class Item:
+class Item(Serializable):
     retailer_id: int
     name: str
     amount: TotalAmount
@@ -94,7 +95,7 @@ class Item:
         self.importer_address = importer_address
 
 
-class Order:
+class Order(Serializable):
     status: str
     expiration: Expiration
     items: List[Item]
@@ -119,7 +120,7 @@ class Order:
         self.discount = discount
 
 
-class RazorPay:
+class RazorPay(Serializable):
     notes: dict
     receipt: str
 
@@ -128,7 +129,7 @@ class RazorPay:
         self.receipt = receipt
 
 
-class PaymentGateway:
+class PaymentGateway(Serializable):
     type: str
     configuration_name: str
     razorpay: RazorPay
@@ -141,7 +142,7 @@ class PaymentGateway:
         self.razorpay = razorpay
 
 
-class PaymentSetting:
+class PaymentSetting(Serializable):
     type: str
     payment_gateway: PaymentGateway
 
@@ -151,7 +152,7 @@ class PaymentSetting:
         self.payment_gateway = payment_gateway
 
 
-class Parameters:
+class Parameters(Serializable):
     reference_id: str
     type: str
     payment_settings: list[PaymentSetting]
@@ -173,7 +174,7 @@ class Parameters:
         self.order = order
 
 
-class Action:
+class Action(Serializable):
     name: str
     parameters: Parameters
 
@@ -182,14 +183,14 @@ class Action:
         self.parameters = parameters
 
 
-class Body:
+class Body(Serializable):
     text: str
 
     def __init__(self, text: str) -> None:
         self.text = text
 
 
-class Image:
+class Image(Serializable):
     link: str
 
     def __init__(self,
@@ -198,7 +199,7 @@ class Image:
         self.link = link
 
 
-class Header:
+class Header(Serializable):
     type: str
     text: str
 
@@ -207,7 +208,7 @@ class Header:
         self.text = text
 
 
-class Interactive:
+class Interactive(Serializable):
     type: str
     header: Header
     body: Body
@@ -223,7 +224,7 @@ class Interactive:
         self.action = action
 
 
-class InteractivePaymentMessage:
+class InteractivePaymentMessage(Serializable):
     messaging_product: str
     recipient_type: str
     to: str
@@ -1,4 +1,7 @@
-class Order:
+from model.serializable import Serializable
+
+
+class Order(Serializable):
     status: str
     description: str
 
@@ -7,7 +10,7 @@ class Order:
         self.description = description
 
 
-class Parameters:
+class Parameters(Serializable):
     reference_id: str
     order: Order
 
@@ -16,7 +19,7 @@ class Parameters:
         self.order = order
 
 
-class Action:
+class Action(Serializable):
     name: str
     parameters: Parameters
 
@@ -25,14 +28,14 @@ class Action:
         self.parameters = parameters
 
 
-class Body:
+class Body(Serializable):
     text: str
 
     def __init__(self, text: str) -> None:
         self.text = text
 
 
-class Interactive:
+class Interactive(Serializable):
     type: str
     body: Body
     action: Action
@@ -43,7 +46,7 @@ class Interactive:
         self.action = action
 
 
-class OrderConfirmation:
+class OrderConfirmation(Serializable):
     messaging_product: str
     recipient_type: str
     to: str
@@ -0,0 +1,34 @@
+import json
+from collections.abc import Mapping
+
+_PRIMITIVES = (str, int, float, bool)
+
+
+class Serializable:
+    """
+    Base for outbound message models. Encodes the object graph straight to
+    plain dicts, so a request body is serialized exactly once.
+    """
+
+    def to_dict(self) -> dict:
+        return {key: encode(value) for key, value in self.__dict__.items()}
+
+    def to_json(self) -> bytes:
+        return dumps(self)
+
+
+def encode(value):
+    if value is None or isinstance(value, _PRIMITIVES):
+        return value
+    if isinstance(value, Serializable):
+        return value.to_dict()
+    if isinstance(value, (list, tuple)):
+        return [encode(item) for item in value]
+    if isinstance(value, Mapping):
+        return {key: encode(item) for key, item in value.items()}
+    return encode(value.__dict__)
+
+
+def dumps(value) -> bytes:
+    return json.dumps(encode(value), ensure_ascii=False,
+                      separators=(",", ":")).encode("utf-8")
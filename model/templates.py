@@ -1,9 +1,11 @@
 from dataclasses import dataclass
 from typing import List
 
+from model.serializable import Serializable
+
 
 @dataclass
-class Image:
+class Image(Serializable):
     link: str
 
     def __init__(self, link: str):
@@ -11,7 +13,7 @@ class Image:
 
 
 @dataclass
-class ImageParameter:
+class ImageParameter(Serializable):
     type: str
     image: Image
 
@@ -21,7 +23,7 @@ class ImageParameter:
 
 
 @dataclass
-class Parameter:
+class Parameter(Serializable):
     type: str
     text: str
 
@@ -31,7 +33,7 @@ class Parameter:
 
 
 @dataclass
-class Component:
+class Component(Serializable):
     type: str
     parameters: List[Parameter]
 
@@ -41,7 +43,7 @@ class Component:
 
 
 @dataclass
-class Language:
+class Language(Serializable):
     code: str
 
     def __init__(self, code: str) -> None:
@@ -49,7 +51,7 @@ class Language:
 
 
 @dataclass
-class Template:
+class Template(Serializable):
     name: str
     language: Language
     components: List[Component]
@@ -62,7 +64,7 @@ class Template:
 
 
 @dataclass
-class TemplateMessage:
+class TemplateMessage(Serializable):
     messaging_product: str
     recipient_type: str
     to: str
@@ -1,4 +1,7 @@
-class Text:
+from model.serializable import Serializable
+
+
+class Text(Serializable):
     preview_url: bool
     body: str
 
@@ -7,7 +10,7 @@ class Text:
         self.body = body
 
 
-class TextMessage:
+class TextMessage(Serializable):
     messaging_product: str
     recipient_type: str
     to: str
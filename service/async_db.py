@@ -0,0 +1,74 @@
+import datetime
+import os
+
+from google.auth.credentials import AnonymousCredentials
+from google.cloud.firestore import AsyncClient
+from google.cloud.firestore_v1 import FieldFilter
+
+from logger import Logger
+from service.async_repository import AsyncRepository
+from service.db import PENDING_BOOKING_FIELDS
+from service.document_size import record_read
+from service.repository import BaseRepository
+
+
+class AsyncDBService(AsyncRepository):
+    """
+    Flow screen reads on Firestore's AsyncClient. The client is created on
+    first use, so it binds to the event loop serving requests.
+    """
+
+    def __init__(self):
+        self.project = os.getenv("GOOGLE_CLOUD_PROJECT")
+        self._db: AsyncClient = None
+
+    @property
+    def db(self) -> AsyncClient:
+        if not self._db:
+            Logger.info(f"Initializing async firestore client for project "
+                        f"{self.project}")
+            if os.getenv("FIRESTORE_EMULATOR_HOST"):
+                self._db = AsyncClient(project=self.project,
+                                       credentials=AnonymousCredentials())
+            else:
+                self._db = AsyncClient(project=self.project)
+        return self._db
+
+    async def get_mobile_token_mapping(self, token: str) -> dict:
+        if not token:
+            return None
+        booking_token = await self.db.collection("booking_token").document(token).get(
+            field_paths=["mobile"])
+        record_read("get_mobile_token_mapping", [booking_token])
+        if not booking_token.exists:
+            return dict()
+        return {token: booking_token.get("mobile")}
+
+    async def get_pending_booking(self, token=None, mobile=None):
+        bookings = self.db.collection("pending_bookings")
+        if token:
+            bookings = bookings.where(filter=FieldFilter("token", "==", token))
+        if mobile:
+            bookings = bookings.where(filter=FieldFilter("mobile", "==", mobile))
+        all_pending_bookings = record_read(
+            "get_pending_booking",
+            await bookings.select(PENDING_BOOKING_FIELDS).limit(1).get())
+        return all_pending_bookings[0] if all_pending_bookings else None
+
+    async def get_reserved_slots(self, date) -> dict:
+        availability_ref = self.db.collection("slot_availability").document(
+            BaseRepository.availability_id(date))
+        availability = await availability_ref.get(field_paths=["slots", "sharded"])
+        record_read("get_held_slots", [availability])
+        availability = availability.to_dict() or dict()
+        held_slots = availability.get("slots") or dict()
+        if availability.get("sharded"):
+            shards = record_read("get_slot_shards",
+                                 await availability_ref.collection("slots").get())
+            held_slots = {shard.id: shard.to_dict() for shard in shards}
+        current_ts = datetime.datetime.now(datetime.timezone.utc)
+        return {
+            slot: entry
+            for slot, entry in held_slots.items()
+            if BaseRepository.is_slot_held(entry, current_ts)
+        }
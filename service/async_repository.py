@@ -0,0 +1,43 @@
+import asyncio
+from abc import ABC, abstractmethod
+
+from service.repository import BaseRepository
+
+
+class AsyncRepository(ABC):
+    """
+    The reads flow screens make, awaitable so independent reads of one
+    screen can be gathered
+    """
+
+    @abstractmethod
+    async def get_mobile_token_mapping(self, token: str) -> dict:
+        pass
+
+    @abstractmethod
+    async def get_pending_booking(self, token=None, mobile=None):
+        pass
+
+    @abstractmethod
+    async def get_reserved_slots(self, date) -> dict:
+        pass
+
+
+class ThreadedAsyncRepository(AsyncRepository):
+    """
+    Runs the reads of a blocking repository on the default executor, used
+    for the in-memory and SQLite backends
+    """
+
+    def __init__(self, repository: BaseRepository):
+        self.repository = repository
+
+    async def get_mobile_token_mapping(self, token: str) -> dict:
+        return await asyncio.to_thread(self.repository.get_mobile_token_mapping, token)
+
+    async def get_pending_booking(self, token=None, mobile=None):
+        return await asyncio.to_thread(self.repository.get_pending_booking,
+                                       token=token, mobile=mobile)
+
+    async def get_reserved_slots(self, date) -> dict:
+        return await asyncio.to_thread(self.repository.get_reserved_slots, date)
@@ -1,30 +1,210 @@
 import datetime
+import threading
+import time
 from abc import ABC
+from types import MappingProxyType
+from typing import Mapping, NamedTuple
 
 import pytz
 
 from external.whatsapp_api import WhatsappApi
+from logger import Logger
 from message_builder_service import MessageBuilderService
-from service.db import DBService
+from metrics import Metrics
+from service.booking_window import ConfirmedBookingWindow
+from service.repository import BaseRepository
+
+
+class SlotIndex(NamedTuple):
+    """
+    Active slots by id and by weekday, and the bit of every slot in the
+    integer masks that represent slot sets of a date. A slot's bit is its
+    bit_index field, its start_hour otherwise, so it is stable across
+    catalog reloads. Slots of one weekday must not share a bit, a catalog
+    where they do is rejected.
+    """
+    slots: Mapping[str, Mapping]
+    day_wise_slots: Mapping[int, tuple[Mapping, ...]]
+    bits: Mapping[str, int]
+
+    @staticmethod
+    def build(slots: dict, day_wise_slots: dict) -> "SlotIndex":
+        bits = dict()
+        for day, day_slots in day_wise_slots.items():
+            day_bits = dict()
+            for slot in day_slots:
+                bit = SlotIndex.slot_bit(slot)
+                if bit in day_bits:
+                    raise ValueError(f"Slots {day_bits[bit]} and {slot.get('id')} of "
+                                     f"day {day} share bit {bit}, set bit_index")
+                day_bits[bit] = slot.get("id")
+                bits[slot.get("id")] = bit
+        return SlotIndex(
+            slots=MappingProxyType(
+                {_id: MappingProxyType(slot) for _id, slot in slots.items()}
+            ),
+            day_wise_slots=MappingProxyType(
+                {day: tuple(MappingProxyType(slot) for slot in day_slots)
+                 for day, day_slots in day_wise_slots.items()}
+            ),
+            bits=MappingProxyType(bits)
+        )
+
+    @staticmethod
+    def slot_bit(slot: Mapping) -> int:
+        bit = slot.get("bit_index")
+        return int(bit if bit is not None else slot.get("start_hour"))
+
+    def mask(self, slot_ids) -> int:
+        """
+        Bitmask of the slot ids, ids of inactive slots are left out
+        """
+        mask = 0
+        for slot_id in slot_ids:
+            bit = self.bits.get(slot_id)
+            if bit is not None:
+                mask |= 1 << bit
+        return mask
+
+    def has(self, mask: int, slot_id: str) -> bool:
+        """
+        Whether the slot's bit is set, False for ids of inactive slots
+        """
+        bit = self.bits.get(slot_id)
+        return bit is not None and bool(mask >> bit & 1)
+
+
+class Catalog:
+    """
+    Slots and secrets loaded once per process and shared by every processor.
+    Slots and secrets are kept live by snapshot listeners which swap in new
+    objects, so readers only ever dereference self.index and never lock.
+    """
+    initial_snapshot_timeout = 10
+
+    def __init__(self, db_service, watch=True):
+        start = time.perf_counter()
+        self.index: SlotIndex = None
+        self._initial_snapshot = threading.Event()
+        self._slots_watch = None
+        if watch:
+            self._slots_watch = db_service.watch_slots(self._on_slots_snapshot)
+            if not self._initial_snapshot.wait(self.initial_snapshot_timeout):
+                Logger.error("Slots listener timed out, loading slots directly")
+        if not self.index:
+            self.index = SlotIndex.build(*db_service.get_all_slots())
+        self.secrets = db_service.get_all_secrets()
+        self._secrets_watch = None
+        if watch:
+            self._secrets_watch = db_service.watch_secrets(self._on_secrets_snapshot)
+        self.confirmed_bookings: ConfirmedBookingWindow = None
+        if watch:
+            self.confirmed_bookings = ConfirmedBookingWindow(
+                db_service,
+                days=int(self.secrets.get("BOOKING_WINDOW_DAYS") or 3),
+                snapshot_timeout=float(
+                    self.secrets.get("BOOKING_WINDOW_SNAPSHOT_TIMEOUT") or 60)
+            )
+        self.load_time_ms = (time.perf_counter() - start) * 1000
+        Metrics.gauge("catalog.load_time_ms", self.load_time_ms)
+        Logger.info(f"Catalog loaded {len(self.slots)} slots in "
+                    f"{self.load_time_ms:.1f} ms")
+
+    @property
+    def slots(self) -> Mapping[str, Mapping]:
+        return self.index.slots
+
+    @property
+    def day_wise_slots(self) -> Mapping[int, tuple[Mapping, ...]]:
+        return self.index.day_wise_slots
+
+    def _on_slots_snapshot(self, docs, changes, read_time):
+        try:
+            self.index = SlotIndex.build(*BaseRepository.index_slots(docs))
+        except Exception as e:
+            Logger.error(f"Ignoring invalid slots snapshot {e}")
+            return
+        finally:
+            self._initial_snapshot.set()
+        Metrics.increment("catalog.slots_refresh")
+        Logger.info(f"Slots refreshed at {read_time}, {len(self.index.slots)} active")
+
+    def _on_secrets_snapshot(self, docs, changes, read_time):
+        secrets = docs[0].to_dict() if docs and docs[0].exists else None
+        if not secrets:
+            Logger.error(f"Ignoring empty secrets snapshot at {read_time}")
+            return
+        if secrets != self.secrets:
+            self.secrets = secrets
+            Metrics.increment("catalog.secrets_refresh")
+            Logger.info(f"Secrets refreshed at {read_time}")
+
+    def close(self):
+        if self._slots_watch:
+            self._slots_watch.unsubscribe()
+        if self._secrets_watch:
+            self._secrets_watch.unsubscribe()
+        if self.confirmed_bookings:
+            self.confirmed_bookings.close()
 
 
 class BaseProcessor(ABC):
-    def __init__(self, db_service):
-        self.db_service: DBService = db_service
-        self.slots, self.day_wise_slots = self.db_service.get_all_slots()
+    def __init__(self, db_service, catalog):
+        self.db_service: BaseRepository = db_service
+        self.catalog: Catalog = catalog
         self.mbs = MessageBuilderService()
-        self.secrets = self.db_service.get_all_secrets()
         self.api_service = WhatsappApi(self.secrets.get("WA_API_TOKEN"),
-                                       self.secrets.get("MOBILE_ID"))
+                                       self.secrets.get("MOBILE_ID"),
+                                       self.secrets.get("WA_API_URL"))
         self.flow_id = self.secrets.get("FLOW_ID")
         self.flow_mode = self.secrets.get("FLOW_MODE") or "draft"
 
-    def get_available_slots(self, formatted_date) -> list[dict]:
+    @property
+    def slots(self) -> Mapping[str, Mapping]:
+        return self.catalog.index.slots
+
+    @property
+    def day_wise_slots(self) -> Mapping[int, tuple[Mapping, ...]]:
+        return self.catalog.index.day_wise_slots
+
+    @property
+    def secrets(self) -> dict:
+        return self.catalog.secrets
+
+    def get_confirmed_bookings(self, date) -> list:
+        """
+        Served from the catalog's confirmed bookings window when the date is
+        in it, queried otherwise
+        """
+        if self.catalog.confirmed_bookings:
+            return self.catalog.confirmed_bookings.get_confirmed_bookings(date)
+        return self.db_service.get_confirmed_bookings(date)
+
+    def get_unavailable_mask(self, formatted_date, reserved_slots: dict) -> int:
+        """
+        Bitmask of the date's slots that cannot be booked, the reserved ones
+        and, for today, the ones that have already started
+        """
+        index = self.catalog.index
         today_date = datetime.datetime.now(pytz.timezone('Asia/Kolkata'))
         date = datetime.datetime.strptime(formatted_date, self.mbs.date_format)
+        unavailable = index.mask(reserved_slots)
+        if today_date.date() == date.date():
+            unavailable |= index.mask(
+                slot.get("id") for slot in index.day_wise_slots.get(date.weekday())
+                if 4 < slot.get("start_hour") <= today_date.hour
+            )
+        return unavailable
+
+    def get_available_slots(self, formatted_date,
+                            reserved_slots: dict = None) -> list[dict]:
+        index = self.catalog.index
+        date = datetime.datetime.strptime(formatted_date, self.mbs.date_format)
         weekday = date.weekday()
-        slots = self.day_wise_slots.get(weekday)
-        reserved_slots: dict = self.db_service.get_reserved_slots(formatted_date)
+        slots = index.day_wise_slots.get(weekday)
+        if reserved_slots is None:
+            reserved_slots = self.db_service.get_reserved_slots(formatted_date)
+        unavailable = self.get_unavailable_mask(formatted_date, reserved_slots)
         # evening_slot_booked = None
         # for _, booking in reserved_slots.items():
         #     for slot in booking.get("slots"):
@@ -36,20 +216,12 @@ class BaseProcessor(ABC):
         #             continue
 
         response = list()
-        current_hour = today_date.hour
 
         for slot in slots:
-            item = {
+            response.append({
                 "id": slot.get("id"),
                 "title": f'{slot.get("title")}',
                 "description": f'₹ {slot.get("price")}',
-                "enabled": True
-            }
-            if reserved_slots.get(slot.get("id")) or (
-                    today_date.date() == date.date()
-                    and slot.get("start_hour") <= current_hour
-                    and slot.get("start_hour") > 4
-            ):
-                item["enabled"] = False
-            response.append(item)
+                "enabled": not index.has(unavailable, slot.get("id"))
+            })
         return response
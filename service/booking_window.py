@@ -0,0 +1,123 @@
+import datetime
+import threading
+import time
+
+import pytz
+
+from logger import Logger
+from message_builder_service import MessageBuilderService
+from metrics import Metrics
+from model.booking import Booking
+
+
+class ConfirmedBookingWindow:
+    """
+    Confirmed bookings for today and the following days, kept in memory by a
+    snapshot listener on confirmed_bookings. Listeners only fire on changes,
+    so dates inside the window are served without a round trip for as long
+    as the listener is active, however old its last snapshot. Dates outside
+    the window and a listener that has not delivered yet fall back to a
+    direct query. A listener that stopped, or did not deliver its first
+    snapshot within snapshot_timeout seconds, is re-subscribed, and the
+    window rolls over at midnight IST.
+    """
+
+    def __init__(self, db_service, days: int = 3, snapshot_timeout: float = 60):
+        self.db_service = db_service
+        self.days = days
+        self.snapshot_timeout = snapshot_timeout
+        self._lock = threading.Lock()
+        self._bookings: dict[str, list[Booking]] = dict()
+        self._synced_at: float = None
+        self._start_date: datetime.date = None
+        self._watch = None
+        self._subscribing = False
+        self._subscribed_at: float = None
+        self._subscribe(self.today())
+
+    @staticmethod
+    def today() -> datetime.date:
+        return datetime.datetime.now(pytz.timezone('Asia/Kolkata')).date()
+
+    def get_confirmed_bookings(self, date: str) -> list[Booking]:
+        bookings = self._cached(date)
+        if bookings is None:
+            Metrics.increment("booking_window.miss")
+            return self.db_service.get_confirmed_bookings(date)
+        Metrics.increment("booking_window.hit")
+        return list(bookings)
+
+    def _cached(self, date: str) -> list[Booking]:
+        today = self.today()
+        if today != self._start_date or not self._listening():
+            self._subscribe(today)
+            return None
+        if self._synced_at is None:
+            return None
+        day = datetime.datetime.strptime(date, MessageBuilderService.date_format).date()
+        if not today <= day < today + datetime.timedelta(days=self.days):
+            return None
+        return self._bookings.get(date, [])
+
+    def _listening(self) -> bool:
+        """
+        True while the listener is active and has delivered its first
+        snapshot, or is still within snapshot_timeout of subscribing
+        """
+        watch = self._watch
+        if not watch or not watch.is_active:
+            return False
+        return self._synced_at is not None or (
+                time.monotonic() - self._subscribed_at <= self.snapshot_timeout)
+
+    def _subscribe(self, start_date: datetime.date):
+        with self._lock:
+            if self._start_date == start_date and (
+                    self._subscribing or self._listening()):
+                return
+            now = time.monotonic()
+            previous, self._watch = self._watch, None
+            self._start_date = start_date
+            self._synced_at = None
+            self._bookings = dict()
+            self._subscribing = True
+            self._subscribed_at = now
+        if previous:
+            previous.unsubscribe()
+        start = datetime.datetime.combine(start_date, datetime.time())
+        watch = None
+        try:
+            # The listener may deliver its first snapshot before this returns
+            watch = self.db_service.watch_confirmed_bookings(
+                start, start + datetime.timedelta(days=self.days),
+                lambda docs, changes, read_time: self._on_snapshot(start_date, docs,
+                                                                   read_time))
+        except Exception as e:
+            Logger.error(f"Unable to watch confirmed bookings {e}")
+        with self._lock:
+            self._subscribing = False
+            if self._start_date == start_date:
+                self._watch, watch = watch, None
+        if watch:
+            watch.unsubscribe()
+        Metrics.increment("booking_window.subscribe")
+
+    def _on_snapshot(self, window: datetime.date, docs, read_time):
+        bookings: dict[str, list[Booking]] = dict()
+        for booking in Booking.create_booking(
+                doc for doc in docs if not doc.to_dict().get("cancelled")):
+            bookings.setdefault(booking.date, list()).append(booking)
+        with self._lock:
+            if window != self._start_date:
+                # Late snapshot of a window that was already rolled over
+                return
+            self._bookings = bookings
+            self._synced_at = time.monotonic()
+        Logger.info(f"Confirmed bookings window from {window} refreshed at "
+                    f"{read_time}, {sum(map(len, bookings.values()))} bookings")
+
+    def close(self):
+        with self._lock:
+            if self._watch:
+                self._watch.unsubscribe()
+            self._watch = None
@@ -0,0 +1,90 @@
+import threading
+import time
+from collections import OrderedDict
+
+
+class LRUCache:
+    """
+    Thread safe, size bounded least recently used cache
+    """
+
+    def __init__(self, capacity: int):
+        self.capacity = capacity
+        self._items = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key, default=None):
+        with self._lock:
+            if key not in self._items:
+                return default
+            self._items.move_to_end(key)
+            return self._items[key]
+
+    def put(self, key, value) -> None:
+        with self._lock:
+            self._items[key] = value
+            self._items.move_to_end(key)
+            while len(self._items) > self.capacity:
+                self._items.popitem(last=False)
+
+    def put_if_absent(self, key, value) -> bool:
+        """
+        Stores value only when key is not cached, returns True if it was stored
+        """
+        with self._lock:
+            if key in self._items:
+                self._items.move_to_end(key)
+                return False
+            self._items[key] = value
+            while len(self._items) > self.capacity:
+                self._items.popitem(last=False)
+            return True
+
+    def pop(self, key, default=None):
+        with self._lock:
+            return self._items.pop(key, default)
+
+    def __len__(self):
+        return len(self._items)
+
+
+
+class TTLCache(LRUCache):
+    """
+    LRU cache whose entries expire ttl seconds after they were stored
+    """
+
+    def __init__(self, capacity: int, ttl: float):
+        super().__init__(capacity)
+        self.ttl = ttl
+
+    def get(self, key, default=None):
+        with self._lock:
+            if key not in self._items:
+                return default
+            expires_at, value = self._items[key]
+            if expires_at < time.monotonic():
+                del self._items[key]
+                return default
+            self._items.move_to_end(key)
+            return value
+
+    def put(self, key, value) -> None:
+        super().put(key, (time.monotonic() + self.ttl, value))
+
+    def put_if_absent(self, key, value) -> bool:
+        with self._lock:
+            entry = self._items.get(key)
+            if entry and entry[0] >= time.monotonic():
+                self._items.move_to_end(key)
+                return False
+            self._items[key] = (time.monotonic() + self.ttl, value)
+            self._items.move_to_end(key)
+            while len(self._items) > self.capacity:
+                self._items.popitem(last=False)
+            return True
+
+    def pop(self, key, default=None):
+        with self._lock:
+            entry = self._items.pop(key, None)
+        return default if entry is None else entry[1]
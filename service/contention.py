@@ -0,0 +1,55 @@
+import random
+import threading
+import time
+from collections import deque
+
+from metrics import Metrics
+
+
+class ContentionTracker:
+    """
+    Counts transaction contention per key over a sliding window. A key turns
+    hot once it sees threshold contended attempts within window seconds and
+    stays hot until the window moves past them.
+    """
+
+    def __init__(self, name: str, threshold: int = 3, window: float = 60):
+        self.name = name
+        self.threshold = threshold
+        self.window = window
+        self._events: dict[str, deque] = dict()
+        self._lock = threading.Lock()
+
+    def record(self, key: str) -> bool:
+        """
+        Records one contended attempt for key, returns True if key is hot
+        """
+        Metrics.increment(f"{self.name}.contention")
+        now = time.monotonic()
+        with self._lock:
+            events = self._events.setdefault(key, deque())
+            events.append(now)
+            self._expire(events, now)
+            return len(events) >= self.threshold
+
+    def is_hot(self, key: str) -> bool:
+        with self._lock:
+            events = self._events.get(key)
+            if not events:
+                return False
+            self._expire(events, time.monotonic())
+            if not events:
+                del self._events[key]
+            return len(events or ()) >= self.threshold
+
+    def _expire(self, events: deque, now: float):
+        while events and now - events[0] > self.window:
+            events.popleft()
+
+
+def backoff_with_jitter(attempt: int, base: float = 0.05, cap: float = 1.0) -> float:
+    """
+    Full jitter exponential backoff, a random delay up to base * 2^attempt
+    seconds, capped at cap
+    """
+    return random.uniform(0, min(cap, base * 2 ** attempt))
@@ -1,127 +1,188 @@
 import datetime
 import os
+import time
 
 import firebase_admin
 from firebase_admin import firestore, credentials
+from google.api_core.exceptions import AlreadyExists, Aborted
+from google.auth.credentials import AnonymousCredentials
 from google.cloud.firestore_v1 import FieldFilter
+from google.cloud.firestore_v1.field_path import FieldPath
 
 from logger import Logger
-from message_builder_service import MessageBuilderService
+from metrics import Metrics
 from model.booking import Booking
+from service.cache import TTLCache
+from service.contention import ContentionTracker, backoff_with_jitter
+from service.document_size import record_read
+from service.repository import BaseRepository
+from service.unit_of_work import cached_read, invalidates
 
+USER_CACHE_SIZE = 5000
+USER_CACHE_TTL = 15 * 60
+BOOKING_FIELDS = ["date", "slots", "amount", "mobile", "token"]
+PENDING_BOOKING_FIELDS = BOOKING_FIELDS + ["actual_date", "ttl_ts"]
+TRANSACTION_ATTEMPTS = 3
+HOT_DATE_CONTENTION = 2
+HOT_DATE_WINDOW = 60
+_NOT_CACHED = object()
 
-class DBService:
+
+class DBService(BaseRepository):
 
     def __init__(self):
+        super().__init__()
         project = os.getenv("GOOGLE_CLOUD_PROJECT")
         Logger.info("Initializing firestore client for project {}".format(project))
-        cred = credentials.ApplicationDefault()
+        if os.getenv("FIRESTORE_EMULATOR_HOST"):
+            # Local emulator used by load tests, no application credentials
+            self.db = firestore.Client(project=project,
+                                       credentials=AnonymousCredentials())
+        else:
+            cred = credentials.ApplicationDefault()
 
-        firebase_admin.initialize_app(credential=cred, options={
-            "projectId": project,
-        })
-        # self.app = firebase_admin.initialize_app()
-        self.db = firestore.client()
-        self.batch = self.db.batch()
-        self.mbs = MessageBuilderService()
+            firebase_admin.initialize_app(credential=cred, options={
+                "projectId": project,
+            })
+            # self.app = firebase_admin.initialize_app()
+            self.db = firestore.client()
+        self.user_names = TTLCache(USER_CACHE_SIZE, USER_CACHE_TTL)
+        self.hot_dates = ContentionTracker("availability", HOT_DATE_CONTENTION,
+                                           HOT_DATE_WINDOW)
+        self.sharded_dates = set()
 
     def get_all_slots(self) -> (dict, dict):
-        docs = self.db.collection("slots").where(
+        return self.index_slots(
+            record_read("get_all_slots", self.slots_query().stream()))
+
+    def slots_query(self):
+        return self.db.collection("slots").where(
             filter=FieldFilter("active", "==", True)
-        ).order_by("sort_order").stream()
-        slots = dict()
-        day_wise_slots: dict[int, list: dict] = dict()
+        ).order_by("sort_order")
 
-        for day in range(0, 7):
-            _list = list()
-            day_wise_slots[day] = _list
+    def watch_slots(self, callback):
+        """
+        Subscribes callback(docs, changes, read_time) to active slot changes
+        """
+        return self.slots_query().on_snapshot(callback)
 
-        for doc in docs:
-            slots[doc.to_dict().get('id')] = doc.to_dict()
-            day_wise_slots.get(doc.get("day_id")).append(doc.to_dict())
-        return slots, day_wise_slots
+    def watch_secrets(self, callback):
+        """
+        Subscribes callback(docs, changes, read_time) to changes of secrets/all
+        """
+        return self.db.collection("secrets").document("all").on_snapshot(callback)
 
     def get_all_secrets(self) -> dict:
-        slots_ref = self.db.collection("secrets")
-        docs = slots_ref.stream()
-        for doc in docs:
-            if doc.id == "all":
-                return doc.to_dict()
-        return dict()
+        secrets = self.db.collection("secrets").document("all").get()
+        record_read("get_all_secrets", [secrets])
+        return secrets.to_dict() or dict()
 
+    @invalidates("booking_token")
     def save_flow_token(self, mobile: str, token: str) -> None:
-        _id = self.generate_id(mobile)
-        data = {
-            "mobile": mobile,
-            "token": token,
-            "created_ts": datetime.datetime.now(),
-            "ttl_ts": datetime.datetime.now() + datetime.timedelta(days=30)
-        }
-        self.db.collection("booking_token").document(_id).set(data)
+        self.db.collection("booking_token").document(token).set(
+            self.flow_token_data(mobile, token))
         Logger.info(f"Token {token} added token successfully for {mobile}")
 
-    @staticmethod
-    def generate_id(mobile: str, date: datetime.datetime = None) -> str:
-        current_ts = datetime.datetime.now()
-        if date:
-            return f'{mobile}_{date.strftime("%Y%m%d")}_{current_ts.strftime("%Y%m%d%H%M%S")}'
-        else:
-            return f'{mobile}_{current_ts.strftime("%Y%m%d%H%M%S")}'
-
+    @cached_read("booking_token")
     def get_mobile_token_mapping(self, token: str) -> dict:
         if not token:
             return None
-        tokens = self.db.collection("booking_token").where(
-            filter=FieldFilter("token", "==", token)
-        ).stream()
-        if not tokens:
-            return None
+        booking_token = self.db.collection("booking_token").document(token).get(
+            field_paths=["mobile"])
+        record_read("get_mobile_token_mapping", [booking_token])
+        if not booking_token.exists:
+            return dict()
         Logger.info(f"Found mobile for token {token}")
-        return {t.to_dict().get("token"): t.to_dict().get("mobile") for t in tokens}
+        return {token: booking_token.get("mobile")}
 
+    @invalidates("pending_bookings", "slot_availability")
     def create_booking(self,
                        mobile: str,
                        token: str,
                        amount: int,
                        date: str,
                        slots: list[int]
-                       ) -> None:
+                       ) -> bool:
+        """
+        Checks and claims the slots for a new pending booking in one
+        transaction. Returns False, without writing, when any slot is already
+        confirmed or held by an unexpired pending booking. The history copy is
+        queued once the booking is committed.
+        """
         _id = self.generate_id(mobile,
                                datetime.datetime.strptime(date, self.mbs.date_format)
                                )
-        data = {
-            "mobile": mobile,
-            "token": token,
-            "created_ts": datetime.datetime.now(),
-            "amount": float(amount),
-            "date": date,
-            "actual_date": datetime.datetime.strptime(date, self.mbs.date_format),
-            "slots": sorted(slots),
-            "ttl_ts": datetime.datetime.now() + datetime.timedelta(minutes=7)
-        }
-        self.db.collection("pending_bookings").document(_id).set(data)
-        self.db.collection("pending_bookings_history").document(_id).set(data)
+        data = self.pending_booking_data(mobile, token, amount, date, slots)
+
+        @firestore.transactional
+        def reserve(transaction) -> bool:
+            sharded, held_slots = self.get_held_slots(date, transaction,
+                                                      data.get("slots"))
+            current_ts = datetime.datetime.now(datetime.timezone.utc)
+            if any(self.is_slot_held(held_slots.get(slot), current_ts)
+                   for slot in data.get("slots")):
+                return False
+            transaction.set(self.db.collection("pending_bookings").document(_id), data)
+            self._hold_slots(transaction, date, sharded, {
+                slot: self.availability_entry("pending", token, mobile,
+                                              data.get("ttl_ts"))
+                for slot in data.get("slots")
+            })
+            return True
+
+        if not self.run_transaction(date, reserve):
+            Logger.info(f"Slots {slots} on {date} unavailable for {token} and {mobile}")
+            return False
+        self.booking_history.put(_id, data)
         Logger.info(f"Booking added for {token} and {mobile}")
+        return True
+
+    @invalidates("pending_bookings_history")
+    def append_booking_history(self, bookings: dict[str, dict]) -> None:
+        batch = self.db.batch()
+        for _id, data in bookings.items():
+            batch.set(self.db.collection("pending_bookings_history").document(_id),
+                      data)
+        batch.commit()
 
-    def confirm_booking(self, existing_booking, token, payment_response) -> None:
+    @invalidates("confirmed_bookings", "pending_bookings", "slot_availability")
+    def confirm_booking(self, existing_booking, token, payment_response) -> bool:
+        """
+        Confirms a pending booking in one transaction. Returns False, without
+        writing, when a slot was confirmed meanwhile or is held by another
+        unexpired pending booking.
+        """
         _id = self.generate_id(existing_booking.get("mobile"),
                                existing_booking.get("actual_date"))
-        data = {
-            "mobile": existing_booking.get("mobile"),
-            "token": token,
-            "created_ts": datetime.datetime.now(),
-            "amount": float(existing_booking.get("amount")),
-            "date": existing_booking.get("date"),
-            "actual_date": existing_booking.get("actual_date"),
-            "slots": sorted(existing_booking.get("slots")),
-            "cancelled": False,
-            "payment_response": payment_response
-        }
-        self.db.collection("confirmed_bookings").document(_id).set(data)
-        self.db.collection("pending_bookings").document(existing_booking.id).delete()
+        data = self.confirmed_booking_data(existing_booking, token, payment_response)
+
+        @firestore.transactional
+        def confirm(transaction) -> bool:
+            sharded, held_slots = self.get_held_slots(data.get("date"), transaction,
+                                                      data.get("slots"))
+            current_ts = datetime.datetime.now(datetime.timezone.utc)
+            if any(self.is_slot_held(held_slots.get(slot), current_ts, token)
+                   for slot in data.get("slots")):
+                return False
+            transaction.set(self.db.collection("confirmed_bookings").document(_id),
+                            data)
+            transaction.delete(
+                self.db.collection("pending_bookings").document(existing_booking.id))
+            self._hold_slots(transaction, data.get("date"), sharded, {
+                slot: self.availability_entry("confirmed", token, data.get("mobile"))
+                for slot in data.get("slots")
+            })
+            return True
+
+        if not self.run_transaction(data.get("date"), confirm):
+            Logger.error(f"Slots of {existing_booking.id} unavailable while "
+                         f"confirming {token}")
+            return False
         Logger.info(f"Booking confirmed for {existing_booking.id}, {token}, "
                     f"{existing_booking.get('mobile')}")
+        return True
 
+    @cached_read("pending_bookings")
     def get_pending_booking(self, token=None, mobile=None) -> dict:
         bookings = self.db.collection("pending_bookings")
         if token:
@@ -132,7 +193,9 @@ class DBService:
             bookings = bookings.where(
                 filter=FieldFilter("mobile", "==", mobile)
             )
-        all_pending_bookings = bookings.get()
+        all_pending_bookings = record_read(
+            "get_pending_booking",
+            bookings.select(PENDING_BOOKING_FIELDS).get())
         if all_pending_bookings and len(all_pending_bookings) > 0:
             Logger.info(
                 f"Pending booking {all_pending_bookings[0].to_dict()} for {mobile}")
@@ -140,81 +203,269 @@ class DBService:
         else:
             return None
 
+    @invalidates("confirmed_bookings", "slot_availability")
     def cancel_booking(self, token, mobile) -> None:
-        booking = self.db.collection("confirmed_bookings").where(
+        bookings = record_read("cancel_booking", self.db.collection(
+            "confirmed_bookings"
+        ).where(
             filter=FieldFilter("token", "==", token)
-        )
-        booking.update({"cancelled": True})
+        ).select(["date", "slots", "token"]).get())
+        for booking in bookings:
+            self.release_slots(booking, "confirmed",
+                               lambda transaction, ref=booking.reference:
+                               transaction.update(ref, {"cancelled": True}))
         Logger.info(f"Booking cancelled for {token} and {mobile}")
 
-    def get_reserved_slots(self, date) -> dict:
-        bookings: dict = dict()
-        confirmed_bookings = self.db.collection("confirmed_bookings").where(
-            filter=FieldFilter("date", "==", date)
-        ).where(
-            filter=FieldFilter("cancelled", "==", False)
-        ).stream()
+    def availability_ref(self, date: str):
+        return self.db.collection("slot_availability").document(
+            self.availability_id(date))
 
-        pending_bookings = self.db.collection("pending_bookings").where(
-            filter=FieldFilter("date", "==", date)
-        ).stream()
+    def slot_shards(self, date: str):
+        return self.availability_ref(date).collection("slots")
+
+    def get_held_slots(self, date: str, transaction=None, slots=None) -> (bool, dict):
+        """
+        Whether the date's availability is sharded and its slot id to holding
+        entry. Sharded dates keep one slot_availability/{date}/slots/{slot}
+        document per held slot, when slots are given only theirs are read.
+        """
+        availability = self.availability_ref(date).get(field_paths=["slots", "sharded"],
+                                                       transaction=transaction)
+        record_read("get_held_slots", [availability])
+        availability = availability.to_dict() or {}
+        if not availability.get("sharded"):
+            return False, availability.get("slots") or {}
+        shards = self.slot_shards(date)
+        if slots is not None:
+            shards = self.db.get_all([shards.document(slot) for slot in slots],
+                                     transaction=transaction)
+        else:
+            shards = shards.stream(transaction=transaction)
+        return True, {shard.id: shard.to_dict()
+                      for shard in record_read("get_slot_shards", shards)
+                      if shard.exists}
 
-        for booking in confirmed_bookings:
-            b: dict = booking.to_dict()
-            for slot in b.get("slots"):
-                bookings[slot] = booking.to_dict()
+    def _hold_slots(self, transaction, date: str, sharded: bool,
+                    entries: dict) -> None:
+        if sharded:
+            for slot, entry in entries.items():
+                transaction.set(self.slot_shards(date).document(slot), entry)
+        else:
+            transaction.set(self.availability_ref(date), {
+                "date": date,
+                "slots": entries
+            }, merge=True)
+
+    def _remove_held_slots(self, transaction, date: str, sharded: bool,
+                           slots: list) -> None:
+        if sharded:
+            for slot in slots:
+                transaction.delete(self.slot_shards(date).document(slot))
+        elif slots:
+            transaction.update(self.availability_ref(date), {
+                FieldPath("slots", slot).to_api_repr(): firestore.DELETE_FIELD
+                for slot in slots
+            })
+
+    def run_transaction(self, date: str, function):
+        """
+        Runs a @firestore.transactional function on the date's availability.
+        The client retries aborted commits itself, keeping the transaction's
+        place in line. A transaction still aborted after those retries counts
+        as contention on the date and is run again after a jittered backoff,
+        and a date that keeps contending is sharded by slot before the next
+        run, so bookings of different slots stop conflicting.
+        """
+        for attempt in range(TRANSACTION_ATTEMPTS):
+            try:
+                return function(self.db.transaction())
+            except (Aborted, ValueError) as e:
+                contended = isinstance(e, Aborted) or isinstance(e.__cause__, Aborted)
+                if not contended or attempt == TRANSACTION_ATTEMPTS - 1:
+                    raise
+            Metrics.increment("availability.retries")
+            if self.hot_dates.record(date) and date not in self.sharded_dates:
+                self.shard_availability(date)
+            time.sleep(backoff_with_jitter(attempt))
+
+    def shard_availability(self, date: str) -> None:
+        """
+        Moves the date's held slots from the slot_availability document to
+        per-slot documents and marks the date sharded
+        """
+        availability_ref = self.availability_ref(date)
+
+        @firestore.transactional
+        def shard(transaction) -> bool:
+            sharded, held_slots = self.get_held_slots(date, transaction)
+            if sharded:
+                return False
+            self._hold_slots(transaction, date, True, held_slots)
+            transaction.set(availability_ref, {
+                "date": date,
+                "sharded": True,
+                "slots": firestore.DELETE_FIELD
+            }, merge=True)
+            return True
+
+        try:
+            if shard(self.db.transaction()):
+                Metrics.increment("availability.sharded")
+                Logger.info(f"Availability of {date} sharded by slot")
+            self.sharded_dates.add(date)
+        except Exception as e:
+            Logger.error(f"Unable to shard availability of {date} {e}")
+
+    def release_slots(self, booking, state: str, write) -> None:
+        """
+        Runs write(transaction) and removes the booking's slots from the date's
+        availability in one transaction, only where the slot is still held by
+        this booking's token in the given state
+        """
+        booking_data = booking.to_dict()
+        date = booking_data.get("date")
 
-        for booking in pending_bookings:
-            b: dict = booking.to_dict()
-            for slot in b.get("slots"):
-                bookings[slot] = booking.to_dict()
+        @firestore.transactional
+        def release(transaction):
+            sharded, held_slots = self.get_held_slots(date, transaction,
+                                                      booking_data.get("slots"))
+            write(transaction)
+            self._remove_held_slots(transaction, date, sharded, [
+                slot for slot in booking_data.get("slots")
+                if (held_slots.get(slot)
+                    and held_slots.get(slot).get("token") == booking_data.get("token")
+                    and held_slots.get(slot).get("state") == state)
+            ])
 
-        return bookings
+        self.run_transaction(date, release)
 
+    @cached_read("slot_availability")
+    def get_reserved_slots(self, date) -> dict:
+        """
+        Slot id to holding entry for the date, read from the materialized
+        slot_availability document. Pending holds past their expiry are
+        ignored even before the expiry job removes them.
+        """
+        current_ts = datetime.datetime.now(datetime.timezone.utc)
+        _, held_slots = self.get_held_slots(date)
+        return {
+            slot: entry
+            for slot, entry in held_slots.items()
+            if self.is_slot_held(entry, current_ts)
+        }
+
+    @cached_read("confirmed_bookings")
     def get_confirmed_bookings(self, date) -> list[Booking]:
         confirmed_bookings = self.db.collection("confirmed_bookings").where(
             filter=FieldFilter("date", "==", date)
         ).where(
             filter=FieldFilter("cancelled", "==", False)
-        ).stream()
-        return Booking.create_booking(confirmed_bookings)
+        ).select(BOOKING_FIELDS).stream()
+        return Booking.create_booking(
+            record_read("get_confirmed_bookings", confirmed_bookings))
 
+    def watch_confirmed_bookings(self, start: datetime.datetime,
+                                 end: datetime.datetime, callback):
+        """
+        Subscribes callback(docs, changes, read_time) to confirmed bookings
+        with actual_date in [start, end)
+        """
+        return self.db.collection("confirmed_bookings").where(
+            filter=FieldFilter("actual_date", ">=", start)
+        ).where(
+            filter=FieldFilter("actual_date", "<", end)
+        ).on_snapshot(callback)
+
+    @cached_read("confirmed_bookings")
     def get_confirmed_booking_by_token(self, token) -> list[Booking]:
         confirmed_bookings = self.db.collection("confirmed_bookings").where(
             filter=FieldFilter("token", "==", token)
         ).where(
             filter=FieldFilter("cancelled", "==", False)
-        ).stream()
-        return Booking.create_booking(confirmed_bookings)
+        ).select(BOOKING_FIELDS).stream()
+        return Booking.create_booking(
+            record_read("get_confirmed_booking_by_token", confirmed_bookings))
 
+    @cached_read("pending_bookings")
     def get_pending_bookings(self, date) -> list[Booking]:
         pending_bookings = self.db.collection("pending_bookings").where(
             filter=FieldFilter("date", "==", date)
         ).where(
             filter=FieldFilter("cancelled", "==", False)
-        ).stream()
-        return Booking.create_booking(pending_bookings)
+        ).select(BOOKING_FIELDS).stream()
+        return Booking.create_booking(
+            record_read("get_pending_bookings", pending_bookings))
 
-    def remove_pending_bookings(self) -> None:
-        current_ts = datetime.datetime.now()
-        pending_bookings = self.db.collection("pending_bookings").where(
+    def get_expired_pending_bookings(self, current_ts: datetime.datetime, limit: int,
+                                     start_after=None) -> list:
+        """
+        One page of pending bookings whose ttl_ts is before current_ts, in
+        ttl_ts order. Pass the last snapshot of a page as start_after to
+        read the next one.
+        """
+        query = self.db.collection("pending_bookings").where(
             filter=FieldFilter("ttl_ts", "<", current_ts)
-        ).stream()
-        for booking in pending_bookings:
-            Logger.info(
-                f"Removing pending booking for {booking.to_dict().get('mobile')}")
-            self.batch.delete(booking.reference)
-        self.batch.commit()
+        ).order_by("ttl_ts").select(
+            ["date", "slots", "token", "ttl_ts"]
+        ).limit(limit)
+        if start_after:
+            query = query.start_after(start_after)
+        return record_read("get_expired_pending_bookings", query.get())
+
+    @invalidates("pending_bookings", "slot_availability")
+    def expire_pending_bookings(self, date: str, bookings: list) -> int:
+        """
+        Deletes expired pending bookings of one date and releases the slots
+        they still hold in one transaction, returns the number of released
+        slots. The caller keeps bookings and their slots within the 500
+        writes per commit.
+        """
+
+        @firestore.transactional
+        def expire(transaction) -> int:
+            sharded, held_slots = self.get_held_slots(
+                date, transaction,
+                sorted({slot for booking in bookings for slot in booking.get("slots")}))
+            removed = list()
+            for booking in bookings:
+                transaction.delete(booking.reference)
+                for slot in booking.get("slots"):
+                    entry = held_slots.get(slot)
+                    if (entry and entry.get("state") == "pending"
+                            and entry.get("token") == booking.get("token")):
+                        removed.append(slot)
+            self._remove_held_slots(transaction, date, sharded, removed)
+            return len(removed)
+
+        return self.run_transaction(date, expire)
 
-    def get_user_future_bookings(self, mobile, date) -> list[Booking]:
+    @cached_read("confirmed_bookings")
+    def get_user_future_bookings(self, mobile, date, limit: int,
+                                 start_after: str = None) -> (list[Booking], str):
+        """
+        One page of the user's bookings from date on, in date order and
+        projected to the rendered fields. Returns the page and the id of its
+        last booking when more follow, to pass back as start_after.
+        """
         Logger.info("Getting future bookings for {} and date {}".format(mobile, date))
-        future_bookings = self.db.collection("confirmed_bookings").where(
+        collection = self.db.collection("confirmed_bookings")
+        query = collection.where(
             filter=FieldFilter("mobile", "==", mobile)
         ).where(
             filter=FieldFilter("actual_date", ">=", date)
-        ).stream()
-        return Booking.create_booking(future_bookings)
+        ).order_by("actual_date").select(
+            ["date", "slots", "amount", "actual_date"]
+        ).limit(limit + 1)
+        if start_after:
+            cursor = collection.document(start_after).get(field_paths=["actual_date"])
+            if cursor.exists:
+                query = query.start_after(cursor)
+        future_bookings = record_read("get_user_future_bookings", query.get())
+        next_cursor = future_bookings[limit - 1].id \
+            if len(future_bookings) > limit else None
+        return Booking.create_booking(future_bookings[:limit]), next_cursor
 
+    @cached_read("booking_notification_numbers")
     def get_notification_eligible_numbers(self, new_booking_only=True) -> list[str]:
         collection = self.db.collection("booking_notification_numbers").where(
                 filter=FieldFilter("active", "==", True)
@@ -227,19 +478,88 @@ class DBService:
             mobiles = collection.where(
                 filter=FieldFilter("scheduled", "==", True)
             )
-        return [mobile.get("number") for mobile in mobiles.stream()]
+        mobiles = record_read("get_notification_eligible_numbers",
+                              mobiles.select(["number"]).stream())
+        return [mobile.get("number") for mobile in mobiles]
 
+    @invalidates("users")
     def update_user_details(self, mobile, name):
-        _id = mobile
-        data = {
-            "mobile": mobile,
-            "name": name,
-            "last_updated_ts": datetime.datetime.now()
-        }
-        self.db.collection("users").document(_id).set(data)
+        self.db.collection("users").document(mobile).set(
+            self.user_data(mobile, name))
+        self.user_names.put(mobile, name)
+
+    @invalidates("users")
+    def update_users(self, users: dict[str, str]) -> None:
+        """
+        Saves mobile to name for up to 500 users in one batched commit
+        """
+        batch = self.db.batch()
+        for mobile, name in users.items():
+            batch.set(self.db.collection("users").document(mobile),
+                      self.user_data(mobile, name))
+        batch.commit()
+        for mobile, name in users.items():
+            self.user_names.put(mobile, name)
 
+    @cached_read("users")
     def get_user_details(self, mobile) -> str:
-        user = self.db.collection("users").where(
-            filter=FieldFilter("mobile", "==", mobile)
-        ).get()
-        return user[0].to_dict().get("name") if user else None
+        name = self.user_names.get(mobile, _NOT_CACHED)
+        if name is _NOT_CACHED:
+            user = self.db.collection("users").document(mobile).get(
+                field_paths=["name"])
+            record_read("get_user_details", [user])
+            name = user.get("name") if user.exists else None
+            self.user_names.put(mobile, name)
+        return name
+
+    @cached_read("users")
+    def get_user_names(self, mobiles) -> dict[str, str]:
+        """
+        Names for all mobiles, uncached users are fetched in one get_all call
+        """
+        names = dict()
+        missing = set()
+        for mobile in mobiles:
+            name = self.user_names.get(mobile, _NOT_CACHED)
+            if name is _NOT_CACHED:
+                missing.add(mobile)
+            else:
+                names[mobile] = name
+        if missing:
+            users = record_read("get_user_names", self.db.get_all(
+                [self.db.collection("users").document(mobile) for mobile in missing],
+                field_paths=["name"]
+            ))
+            for user in users:
+                names[user.id] = user.get("name") if user.exists else None
+            for mobile in missing:
+                names.setdefault(mobile, None)
+                self.user_names.put(mobile, names[mobile])
+        return names
+
+    @staticmethod
+    def event_document_id(event_id: str) -> str:
+        return event_id.replace("/", "_")
+
+    def mark_event_processed(self, event_id: str, ttl: datetime.timedelta) -> bool:
+        """
+        Creates the processed marker for a webhook event, returns False when
+        the marker already exists
+        """
+        current_ts = datetime.datetime.now()
+        try:
+            self.db.collection("processed_events").document(
+                self.event_document_id(event_id)
+            ).create({
+                "event_id": event_id,
+                "created_ts": current_ts,
+                "ttl_ts": current_ts + ttl
+            })
+        except AlreadyExists:
+            return False
+        return True
+
+    def remove_event_processed(self, event_id: str) -> None:
+        self.db.collection("processed_events").document(
+            self.event_document_id(event_id)
+        ).delete()
@@ -0,0 +1,68 @@
+import datetime
+import threading
+
+from logger import Logger
+from metrics import Metrics
+from service.cache import LRUCache
+
+
+class MessageDeduplicator:
+    """
+    Drops webhook events Meta redelivers. Event ids are checked against a
+    bounded in-process LRU first and then claimed with a create-only
+    Firestore marker, which expires through the ttl_ts TTL policy.
+    """
+
+    def __init__(self, db_service, capacity: int = 10000,
+                 ttl: datetime.timedelta = datetime.timedelta(days=3)):
+        self.db_service = db_service
+        self.ttl = ttl
+        self.seen = LRUCache(capacity)
+        self.hits = 0
+        self.misses = 0
+        self._lock = threading.Lock()
+
+    def is_duplicate(self, event_id: str) -> bool:
+        """
+        Claims event_id for this process, returns True when it was already seen
+        """
+        if not event_id:
+            return False
+        duplicate = not self.seen.put_if_absent(event_id, True)
+        if not duplicate:
+            try:
+                claimed = self.db_service.mark_event_processed(event_id, self.ttl)
+            except Exception:
+                self.seen.pop(event_id)
+                raise
+            if not claimed:
+                # Claimed by another instance, which may still release it
+                self.seen.pop(event_id)
+                duplicate = True
+        self._record(duplicate)
+        if duplicate:
+            Logger.info(f"Ignoring duplicate webhook event {event_id}")
+        return duplicate
+
+    def release(self, event_id: str) -> None:
+        """
+        Forgets a claimed event whose processing failed, so a redelivery is
+        processed again
+        """
+        if not event_id:
+            return
+        self.seen.pop(event_id)
+        try:
+            self.db_service.remove_event_processed(event_id)
+        except Exception as e:
+            Logger.error(f"Unable to release webhook event {event_id} {e}")
+
+    def _record(self, duplicate: bool):
+        with self._lock:
+            if duplicate:
+                self.hits += 1
+            else:
+                self.misses += 1
+            hit_rate = self.hits / (self.hits + self.misses)
+        Metrics.increment("dedup.hit" if duplicate else "dedup.miss")
+        Metrics.gauge("dedup.hit_rate", hit_rate)
@@ -0,0 +1,267 @@
+import datetime
+
+from logger import Logger
+from model.booking import Booking
+from service.document_store import DocumentStore
+from service.repository import BaseRepository
+from service.unit_of_work import cached_read, invalidates
+
+
+class DocumentRepository(BaseRepository):
+    """
+    BaseRepository on a DocumentStore, with the same collections, document
+    ids and transactional slot checks as the Firestore DBService
+    """
+
+    def __init__(self, store: DocumentStore, **kwargs):
+        super().__init__(**kwargs)
+        self.store = store
+
+    def get_all_slots(self) -> (dict, dict):
+        return self.index_slots(self.active_slots())
+
+    def active_slots(self):
+        return self.store.query("slots", [("active", "==", True)], order_by="sort_order")
+
+    def watch_slots(self, callback):
+        return self.store.watch("slots", lambda: callback(
+            self.active_slots(), [], datetime.datetime.now(datetime.timezone.utc)))
+
+    def watch_secrets(self, callback):
+        return self.store.watch("secrets", lambda: callback(
+            [self.store.get("secrets", "all")], [],
+            datetime.datetime.now(datetime.timezone.utc)))
+
+    def get_all_secrets(self) -> dict:
+        return self.store.get("secrets", "all").to_dict() or dict()
+
+    @invalidates("booking_token")
+    def save_flow_token(self, mobile: str, token: str) -> None:
+        self.store.set("booking_token", token, self.flow_token_data(mobile, token))
+
+    @cached_read("booking_token")
+    def get_mobile_token_mapping(self, token: str) -> dict:
+        if not token:
+            return None
+        booking_token = self.store.get("booking_token", token)
+        if not booking_token.exists:
+            return dict()
+        return {token: booking_token.get("mobile")}
+
+    @invalidates("pending_bookings", "slot_availability")
+    def create_booking(self, mobile: str, token: str, amount: int, date: str,
+                       slots: list[int]) -> bool:
+        _id = self.generate_id(mobile,
+                               datetime.datetime.strptime(date, self.mbs.date_format))
+        data = self.pending_booking_data(mobile, token, amount, date, slots)
+        with self.store.transaction():
+            sharded, held_slots = self.get_held_slots(date)
+            current_ts = datetime.datetime.now(datetime.timezone.utc)
+            if any(self.is_slot_held(held_slots.get(slot), current_ts)
+                   for slot in data.get("slots")):
+                Logger.info(f"Slots {slots} on {date} unavailable for {token} "
+                            f"and {mobile}")
+                return False
+            self.store.set("pending_bookings", _id, data)
+            self._hold_slots(date, sharded, data.get("slots"), self.availability_entry(
+                "pending", token, mobile, data.get("ttl_ts")))
+        self.booking_history.put(_id, data)
+        return True
+
+    @invalidates("pending_bookings_history")
+    def append_booking_history(self, bookings: dict[str, dict]) -> None:
+        with self.store.transaction():
+            for _id, data in bookings.items():
+                self.store.set("pending_bookings_history", _id, data)
+
+    @invalidates("confirmed_bookings", "pending_bookings", "slot_availability")
+    def confirm_booking(self, existing_booking, token, payment_response) -> bool:
+        _id = self.generate_id(existing_booking.get("mobile"),
+                               existing_booking.get("actual_date"))
+        data = self.confirmed_booking_data(existing_booking, token, payment_response)
+        with self.store.transaction():
+            sharded, held_slots = self.get_held_slots(data.get("date"))
+            current_ts = datetime.datetime.now(datetime.timezone.utc)
+            if any(self.is_slot_held(held_slots.get(slot), current_ts, token)
+                   for slot in data.get("slots")):
+                Logger.error(f"Slots of {existing_booking.id} unavailable while "
+                             f"confirming {token}")
+                return False
+            self.store.set("confirmed_bookings", _id, data)
+            self.store.delete("pending_bookings", existing_booking.id)
+            self._hold_slots(data.get("date"), sharded, data.get("slots"),
+                            self.availability_entry("confirmed", token,
+                                                    data.get("mobile")))
+        return True
+
+    @cached_read("pending_bookings")
+    def get_pending_booking(self, token=None, mobile=None):
+        filters = list()
+        if token:
+            filters.append(("token", "==", token))
+        if mobile:
+            filters.append(("mobile", "==", mobile))
+        bookings = self.store.query("pending_bookings", filters, limit=1)
+        return bookings[0] if bookings else None
+
+    @invalidates("confirmed_bookings", "slot_availability")
+    def cancel_booking(self, token, mobile) -> None:
+        with self.store.transaction():
+            for booking in self.store.query("confirmed_bookings",
+                                            [("token", "==", token)]):
+                self.store.set("confirmed_bookings", booking.id, {"cancelled": True},
+                               merge_data=True)
+                self.release_slots(booking, "confirmed")
+
+    def slot_shards(self, date: str) -> str:
+        return f"slot_availability/{self.availability_id(date)}/slots"
+
+    def get_held_slots(self, date: str) -> (bool, dict):
+        """
+        Whether the date's availability is sharded and its slot id to holding
+        entry
+        """
+        availability = self.store.get("slot_availability", self.availability_id(date))
+        if availability.get("sharded"):
+            return True, {shard.id: shard.to_dict()
+                          for shard in self.store.query(self.slot_shards(date))}
+        return False, availability.get("slots") or dict()
+
+    def _hold_slots(self, date: str, sharded: bool, slots: list,
+                    entry: dict) -> None:
+        if sharded:
+            for slot in slots:
+                self.store.set(self.slot_shards(date), slot, entry)
+            return
+        self.store.set("slot_availability", self.availability_id(date), {
+            "date": date,
+            "slots": {slot: entry for slot in slots}
+        }, merge_data=True)
+
+    def shard_availability(self, date: str) -> None:
+        with self.store.transaction():
+            sharded, held_slots = self.get_held_slots(date)
+            if sharded:
+                return
+            for slot, entry in held_slots.items():
+                self.store.set(self.slot_shards(date), slot, entry)
+            self.store.set("slot_availability", self.availability_id(date),
+                           {"date": date, "sharded": True})
+
+    def release_slots(self, booking, state: str) -> int:
+        """
+        Removes the booking's slots from the date's availability, only where
+        the slot is still held by this booking's token in the given state
+        """
+        date = booking.get("date")
+        with self.store.transaction():
+            sharded, held_slots = self.get_held_slots(date)
+            released = [slot for slot in booking.get("slots")
+                        if held_slots.get(slot)
+                        and held_slots.get(slot).get("token") == booking.get("token")
+                        and held_slots.get(slot).get("state") == state]
+            if not released:
+                return 0
+            if sharded:
+                for slot in released:
+                    self.store.delete(self.slot_shards(date), slot)
+                return len(released)
+            for slot in released:
+                held_slots.pop(slot)
+            self.store.set("slot_availability", self.availability_id(date),
+                           {"date": date, "slots": held_slots})
+        return len(released)
+
+    @cached_read("slot_availability")
+    def get_reserved_slots(self, date) -> dict:
+        current_ts = datetime.datetime.now(datetime.timezone.utc)
+        _, held_slots = self.get_held_slots(date)
+        return {
+            slot: entry
+            for slot, entry in held_slots.items()
+            if self.is_slot_held(entry, current_ts)
+        }
+
+    @cached_read("confirmed_bookings")
+    def get_confirmed_bookings(self, date) -> list[Booking]:
+        return Booking.create_booking(self.store.query(
+            "confirmed_bookings", [("date", "==", date), ("cancelled", "==", False)]))
+
+    def watch_confirmed_bookings(self, start: datetime.datetime,
+                                 end: datetime.datetime, callback):
+        return self.store.watch("confirmed_bookings", lambda: callback(
+            self.store.query("confirmed_bookings", [("actual_date", ">=", start),
+                                                    ("actual_date", "<", end)]),
+            [], datetime.datetime.now(datetime.timezone.utc)))
+
+    @cached_read("confirmed_bookings")
+    def get_confirmed_booking_by_token(self, token) -> list[Booking]:
+        return Booking.create_booking(self.store.query(
+            "confirmed_bookings", [("token", "==", token), ("cancelled", "==", False)]))
+
+    @cached_read("pending_bookings")
+    def get_pending_bookings(self, date) -> list[Booking]:
+        return Booking.create_booking(self.store.query(
+            "pending_bookings", [("date", "==", date), ("cancelled", "==", False)]))
+
+    def get_expired_pending_bookings(self, current_ts: datetime.datetime, limit: int,
+                                     start_after=None) -> list:
+        return self.store.query("pending_bookings", [("ttl_ts", "<", current_ts)],
+                                order_by="ttl_ts", limit=limit, start_after=start_after)
+
+    @invalidates("pending_bookings", "slot_availability")
+    def expire_pending_bookings(self, date: str, bookings: list) -> int:
+        released = 0
+        with self.store.transaction():
+            for booking in bookings:
+                self.store.delete("pending_bookings", booking.id)
+                released += self.release_slots(booking, "pending")
+        return released
+
+    @cached_read("confirmed_bookings")
+    def get_user_future_bookings(self, mobile, date, limit: int,
+                                 start_after: str = None) -> (list[Booking], str):
+        cursor = self.store.get("confirmed_bookings", start_after) if start_after else None
+        future_bookings = self.store.query(
+            "confirmed_bookings", [("mobile", "==", mobile), ("actual_date", ">=", date)],
+            order_by="actual_date", limit=limit + 1,
+            start_after=cursor if cursor and cursor.exists else None)
+        next_cursor = future_bookings[limit - 1].id \
+            if len(future_bookings) > limit else None
+        return Booking.create_booking(future_bookings[:limit]), next_cursor
+
+    @cached_read("booking_notification_numbers")
+    def get_notification_eligible_numbers(self, new_booking_only=True) -> list[str]:
+        flag = "new_booking" if new_booking_only else "scheduled"
+        return [mobile.get("number") for mobile in self.store.query(
+            "booking_notification_numbers", [("active", "==", True), (flag, "==", True)])]
+
+    @invalidates("users")
+    def update_user_details(self, mobile, name):
+        self.store.set("users", mobile, self.user_data(mobile, name))
+
+    @invalidates("users")
+    def update_users(self, users: dict[str, str]) -> None:
+        with self.store.transaction():
+            for mobile, name in users.items():
+                self.store.set("users", mobile, self.user_data(mobile, name))
+
+    @cached_read("users")
+    def get_user_details(self, mobile) -> str:
+        return self.store.get("users", mobile).get("name")
+
+    @cached_read("users")
+    def get_user_names(self, mobiles) -> dict[str, str]:
+        return {user.id: user.get("name")
+                for user in self.store.get_all("users", set(mobiles))}
+
+    def mark_event_processed(self, event_id: str, ttl: datetime.timedelta) -> bool:
+        current_ts = datetime.datetime.now()
+        return self.store.create("processed_events", event_id, {
+            "event_id": event_id,
+            "created_ts": current_ts,
+            "ttl_ts": current_ts + ttl
+        })
+
+    def remove_event_processed(self, event_id: str) -> None:
+        self.store.delete("processed_events", event_id)
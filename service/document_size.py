@@ -0,0 +1,53 @@
+import datetime
+
+from metrics import Metrics
+
+DOCUMENT_OVERHEAD = 32
+NAME_OVERHEAD = 16
+
+
+def value_size(value) -> int:
+    """
+    Storage size of a Firestore value, following
+    https://firebase.google.com/docs/firestore/storage-size
+    """
+    if value is None or isinstance(value, bool):
+        return 1
+    if isinstance(value, (int, float, datetime.datetime)):
+        return 8
+    if isinstance(value, str):
+        return len(value.encode("utf-8")) + 1
+    if isinstance(value, bytes):
+        return len(value)
+    if isinstance(value, dict):
+        return sum(value_size(key) + value_size(item) for key, item in value.items())
+    if isinstance(value, (list, tuple)):
+        return sum(value_size(item) for item in value)
+    if hasattr(value, "path"):
+        return name_size(value.path)
+    # GeoPoint
+    return 16
+
+
+def name_size(path: str) -> int:
+    return sum(len(part.encode("utf-8")) + 1 for part in path.split("/")) \
+        + NAME_OVERHEAD
+
+
+def document_size(snapshot) -> int:
+    if not snapshot.exists:
+        return 0
+    return (name_size(snapshot.reference.path) + value_size(snapshot.to_dict())
+            + DOCUMENT_OVERHEAD)
+
+
+def record_read(name: str, snapshots) -> list:
+    """
+    Publishes the documents and estimated bytes a read returned, as
+    firestore.documents.<name> and firestore.bytes.<name>
+    """
+    snapshots = list(snapshots)
+    Metrics.increment(f"firestore.documents.{name}", len(snapshots))
+    Metrics.observe(f"firestore.bytes.{name}",
+                    sum(document_size(snapshot) for snapshot in snapshots))
+    return snapshots
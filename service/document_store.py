@@ -0,0 +1,282 @@
+import copy
+import datetime
+import json
+import sqlite3
+import threading
+from abc import ABC, abstractmethod
+from contextlib import contextmanager
+
+OPERATORS = {
+    "==": lambda value, expected: value == expected,
+    "!=": lambda value, expected: value != expected,
+    "<": lambda value, expected: value < expected,
+    "<=": lambda value, expected: value <= expected,
+    ">": lambda value, expected: value > expected,
+    ">=": lambda value, expected: value >= expected,
+    "in": lambda value, expected: value in expected,
+    "array_contains": lambda value, expected: expected in value,
+}
+
+
+def normalize(value):
+    """
+    Stores naive datetimes as UTC, the way the Firestore client does
+    """
+    if isinstance(value, datetime.datetime) and value.tzinfo is None:
+        return value.replace(tzinfo=datetime.timezone.utc)
+    if isinstance(value, dict):
+        return {key: normalize(item) for key, item in value.items()}
+    if isinstance(value, (list, tuple)):
+        return [normalize(item) for item in value]
+    return value
+
+
+def merge(current: dict, data: dict) -> dict:
+    merged = dict(current)
+    for key, value in data.items():
+        if isinstance(value, dict) and isinstance(merged.get(key), dict):
+            merged[key] = merge(merged[key], value)
+        else:
+            merged[key] = value
+    return merged
+
+
+class Document:
+    """
+    Read only snapshot with the parts of the Firestore DocumentSnapshot
+    interface the processors use
+    """
+
+    def __init__(self, collection: str, _id: str, data: dict = None):
+        self.collection = collection
+        self.id = _id
+        self._data = data
+
+    @property
+    def exists(self) -> bool:
+        return self._data is not None
+
+    def get(self, field: str):
+        value = self._data
+        for part in field.split("."):
+            if not isinstance(value, dict):
+                return None
+            value = value.get(part)
+        return copy.deepcopy(value)
+
+    def to_dict(self) -> dict:
+        return copy.deepcopy(self._data)
+
+
+class Watch:
+    def __init__(self, store: "DocumentStore", collection: str, listener):
+        self.store = store
+        self.collection = collection
+        self.listener = listener
+        self.is_active = True
+
+    def unsubscribe(self):
+        self.is_active = False
+        self.store.unwatch(self)
+
+
+class DocumentStore(ABC):
+    """
+    Collections of documents with Firestore query semantics: documents
+    missing a filtered or ordered field never match, results are ordered by
+    the order_by field and then document id. transaction() serializes the
+    reads and writes made inside it.
+    """
+
+    def __init__(self):
+        self._lock = threading.RLock()
+        self._watches: list[Watch] = list()
+
+    @abstractmethod
+    def _load(self, collection: str, _id: str) -> dict:
+        pass
+
+    @abstractmethod
+    def _load_all(self, collection: str) -> list[tuple[str, dict]]:
+        pass
+
+    @abstractmethod
+    def _save(self, collection: str, _id: str, data: dict) -> None:
+        pass
+
+    @abstractmethod
+    def _remove(self, collection: str, _id: str) -> None:
+        pass
+
+    @contextmanager
+    def transaction(self):
+        with self._lock:
+            yield
+
+    def get(self, collection: str, _id: str) -> Document:
+        with self._lock:
+            return Document(collection, _id, self._load(collection, _id))
+
+    def get_all(self, collection: str, ids) -> list[Document]:
+        with self._lock:
+            return [Document(collection, _id, self._load(collection, _id))
+                    for _id in ids]
+
+    def set(self, collection: str, _id: str, data: dict, merge_data=False) -> None:
+        with self._lock:
+            data = normalize(data)
+            if merge_data:
+                data = merge(self._load(collection, _id) or dict(), data)
+            self._save(collection, _id, data)
+        self._notify(collection)
+
+    def create(self, collection: str, _id: str, data: dict) -> bool:
+        """
+        Writes data only when the document does not exist yet
+        """
+        with self._lock:
+            if self._load(collection, _id) is not None:
+                return False
+            self._save(collection, _id, normalize(data))
+        self._notify(collection)
+        return True
+
+    def delete(self, collection: str, _id: str) -> None:
+        with self._lock:
+            self._remove(collection, _id)
+        self._notify(collection)
+
+    def query(self, collection: str, filters: list[tuple] = (), order_by: str = None,
+              limit: int = None, start_after: Document = None) -> list[Document]:
+        with self._lock:
+            documents = [Document(collection, _id, data)
+                         for _id, data in self._load_all(collection)]
+        for field, op, expected in filters:
+            expected = normalize(expected)
+            documents = [document for document in documents
+                         if document.get(field) is not None
+                         and OPERATORS[op](document.get(field), expected)]
+        if order_by:
+            documents = [document for document in documents
+                         if document.get(order_by) is not None]
+
+        def key(document: Document):
+            return (document.get(order_by), document.id) if order_by else document.id
+
+        documents.sort(key=key)
+        if start_after:
+            cursor = key(start_after)
+            documents = [document for document in documents if key(document) > cursor]
+        return documents[:limit] if limit else documents
+
+    def watch(self, collection: str, listener) -> Watch:
+        """
+        Calls listener() now and after every write to the collection
+        """
+        watch = Watch(self, collection, listener)
+        with self._lock:
+            self._watches.append(watch)
+        listener()
+        return watch
+
+    def unwatch(self, watch: Watch) -> None:
+        with self._lock:
+            if watch in self._watches:
+                self._watches.remove(watch)
+
+    def _notify(self, collection: str):
+        with self._lock:
+            watches = [watch for watch in self._watches
+                       if watch.collection == collection]
+        for watch in watches:
+            watch.listener()
+
+
+class InMemoryStore(DocumentStore):
+    def __init__(self):
+        super().__init__()
+        self._collections: dict[str, dict[str, dict]] = dict()
+
+    def _load(self, collection: str, _id: str) -> dict:
+        return copy.deepcopy(self._collections.get(collection, dict()).get(_id))
+
+    def _load_all(self, collection: str) -> list[tuple[str, dict]]:
+        return copy.deepcopy(list(self._collections.get(collection, dict()).items()))
+
+    def _save(self, collection: str, _id: str, data: dict) -> None:
+        self._collections.setdefault(collection, dict())[_id] = copy.deepcopy(data)
+
+    def _remove(self, collection: str, _id: str) -> None:
+        self._collections.get(collection, dict()).pop(_id, None)
+
+
+class SqliteStore(DocumentStore):
+    """
+    Documents stored as JSON in a single table, datetimes are kept as
+    tagged ISO strings
+    """
+
+    def __init__(self, path: str):
+        super().__init__()
+        self.connection = sqlite3.connect(path, check_same_thread=False,
+                                          isolation_level=None)
+        self.connection.execute("PRAGMA journal_mode=WAL")
+        self.connection.execute(
+            "CREATE TABLE IF NOT EXISTS documents (collection TEXT NOT NULL, "
+            "id TEXT NOT NULL, data TEXT NOT NULL, PRIMARY KEY (collection, id))"
+        )
+        self._depth = 0
+
+    @contextmanager
+    def transaction(self):
+        with self._lock:
+            self._depth += 1
+            if self._depth == 1:
+                self.connection.execute("BEGIN IMMEDIATE")
+            try:
+                yield
+            except Exception:
+                if self._depth == 1:
+                    self.connection.execute("ROLLBACK")
+                raise
+            else:
+                if self._depth == 1:
+                    self.connection.execute("COMMIT")
+            finally:
+                self._depth -= 1
+
+    @staticmethod
+    def _encode(value):
+        if isinstance(value, datetime.datetime):
+            return {"$datetime": value.isoformat()}
+        raise TypeError(f"Cannot store {type(value)}")
+
+    @staticmethod
+    def _decode(value: dict):
+        if "$datetime" in value:
+            return datetime.datetime.fromisoformat(value["$datetime"])
+        return value
+
+    def _load(self, collection: str, _id: str) -> dict:
+        row = self.connection.execute(
+            "SELECT data FROM documents WHERE collection = ? AND id = ?",
+            (collection, _id)
+        ).fetchone()
+        return json.loads(row[0], object_hook=self._decode) if row else None
+
+    def _load_all(self, collection: str) -> list[tuple[str, dict]]:
+        rows = self.connection.execute(
+            "SELECT id, data FROM documents WHERE collection = ?", (collection,)
+        ).fetchall()
+        return [(_id, json.loads(data, object_hook=self._decode)) for _id, data in rows]
+
+    def _save(self, collection: str, _id: str, data: dict) -> None:
+        self.connection.execute(
+            "INSERT OR REPLACE INTO documents (collection, id, data) VALUES (?, ?, ?)",
+            (collection, _id, json.dumps(data, default=self._encode))
+        )
+
+    def _remove(self, collection: str, _id: str) -> None:
+        self.connection.execute(
+            "DELETE FROM documents WHERE collection = ? AND id = ?", (collection, _id)
+        )
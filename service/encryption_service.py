@@ -1,23 +1,61 @@
 import base64
+import threading
 from base64 import b64decode, b64encode
 
 from cryptography.hazmat.primitives import serialization, asymmetric, hashes
 from cryptography.hazmat.primitives.ciphers import Cipher, algorithms, modes
 
+from logger import Logger
+from metrics import Metrics
+
 
 class Encryption:
-    def __init__(self, secrets):
-        self.private_key = base64.b64decode(secrets.get("CBC_CERT_PEM"))
-        self.key_password = secrets.get("CBC_CERT_PW")
+    """
+    Decrypts and encrypts WhatsApp flow payloads. The password protected
+    private key is parsed once and cached against the CBC_CERT_PEM and
+    CBC_CERT_PW it was loaded from, so a rotated secret is picked up on the
+    next request without reparsing the PEM on every call.
+    """
+
+    def __init__(self, catalog):
+        self.catalog = catalog
+        self._lock = threading.Lock()
+        self._key_source = None
+        self._private_key = None
+        self._failed_source = None
+
+    def get_private_key(self):
+        secrets = self.catalog.secrets
+        source = (secrets.get("CBC_CERT_PEM"), secrets.get("CBC_CERT_PW"))
+        if source == self._key_source or source == self._failed_source:
+            return self._private_key
+        with self._lock:
+            if source == self._key_source or source == self._failed_source:
+                return self._private_key
+            try:
+                private_key = serialization.load_pem_private_key(
+                    base64.b64decode(source[0]),
+                    password=str.encode(source[1]),
+                )
+            except Exception as e:
+                if not self._private_key:
+                    raise
+                Logger.error(f"Unable to load rotated private key, "
+                             f"keeping previous key {e}")
+                self._failed_source = source
+                return self._private_key
+            self._private_key = private_key
+            self._key_source = source
+            self._failed_source = None
+            Metrics.increment("encryption.private_key_load")
+            Logger.info("Loaded flow private key")
+            return private_key
 
     def decrypt_data(self, encrypted_flow_data_b64, encrypted_aes_key_b64,
                      initial_vector_b64) -> (str, bytes, bytes):
         encrypted_aes_key = b64decode(encrypted_aes_key_b64)
-        private_key = serialization.load_pem_private_key(
-            self.private_key,
-            password=str.encode(self.key_password),
-        )
-        aes_key = private_key.decrypt(
+        private_key = self.get_private_key()
+        key = private_key.decrypt(
             encrypted_aes_key,
             asymmetric.padding.OAEP(
                 mgf=asymmetric.padding.MGF1(algorithm=hashes.SHA256()),
@@ -25,9 +63,7 @@ class Encryption:
                 label=None,
             ),
         )
-        aes_key_b64 = b64encode(aes_key)
         flow_data = b64decode(encrypted_flow_data_b64)
-        key = b64decode(aes_key_b64)
         iv = b64decode(initial_vector_b64)
 
         encrypted_flow_data_body = flow_data[:-16]
@@ -40,11 +76,8 @@ class Encryption:
 
     @staticmethod
     def encrypt_data(data, key, iv):
-        flipped_bytes = []
-        for byte in iv:
-            flipped_byte = byte ^ 0xFF
-            flipped_bytes.append(flipped_byte)
-        cipher_respond = Cipher(algorithms.AES(key), modes.GCM(bytes(flipped_bytes)))
+        flipped_iv = bytes(byte ^ 0xFF for byte in iv)
+        cipher_respond = Cipher(algorithms.AES(key), modes.GCM(flipped_iv))
         encryptor = cipher_respond.encryptor()
         encrypted = (
                 encryptor.update(data.encode("utf-8")) +\
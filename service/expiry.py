@@ -0,0 +1,108 @@
+import datetime
+import time
+from collections import defaultdict
+from concurrent.futures import ThreadPoolExecutor
+
+from logger import Logger
+from metrics import Metrics
+
+MAX_WRITES_PER_COMMIT = 500
+
+
+class ExpiryReport:
+    deleted: int
+    released_slots: int
+    pages: int
+    failed_commits: int
+    duration_ms: float
+
+    def __init__(self) -> None:
+        self.deleted = 0
+        self.released_slots = 0
+        self.pages = 0
+        self.failed_commits = 0
+        self.duration_ms = 0
+
+    def __str__(self):
+        return (f"deleted={self.deleted}, released_slots={self.released_slots}, "
+                f"pages={self.pages}, failed_commits={self.failed_commits}, "
+                f"duration_ms={self.duration_ms:.1f}")
+
+
+class PendingBookingExpiry:
+    """
+    Removes pending bookings past their ttl_ts and releases their slots.
+    Expired bookings are paged in ttl_ts order and every page is split into
+    per-date commits of at most 500 writes, committed in parallel. Each
+    commit is a transaction that only releases slots still held by the
+    expired token, so concurrent runs and bookings being confirmed are safe.
+    """
+
+    def __init__(self, db_service, page_size: int = 300, workers: int = 4):
+        self.db_service = db_service
+        self.page_size = page_size
+        self.workers = workers
+
+    def run(self) -> ExpiryReport:
+        report = ExpiryReport()
+        start = time.perf_counter()
+        current_ts = datetime.datetime.now()
+        last = None
+        with ThreadPoolExecutor(self.workers, "pending-expiry") as executor:
+            while True:
+                page = self.db_service.get_expired_pending_bookings(
+                    current_ts, self.page_size, start_after=last)
+                if not page:
+                    break
+                report.pages += 1
+                last = page[-1]
+                chunks = self.chunk(page)
+                for chunk, result in zip(chunks,
+                                         executor.map(self.expire_chunk, chunks)):
+                    if result is None:
+                        report.failed_commits += 1
+                        continue
+                    report.deleted += len(chunk[1])
+                    report.released_slots += result
+                if len(page) < self.page_size:
+                    break
+        report.duration_ms = (time.perf_counter() - start) * 1000
+        Metrics.increment("expiry.deleted", report.deleted)
+        Metrics.increment("expiry.failed_commits", report.failed_commits)
+        Metrics.timing("expiry.run", report.duration_ms)
+        Logger.info(f"Pending booking expiry: {report}")
+        return report
+
+    @staticmethod
+    def chunk(page) -> list[tuple[str, list]]:
+        """
+        Groups a page by date into commits of at most 500 writes, counting a
+        booking's delete and one write per slot, as a sharded date releases
+        every slot separately, plus the date's availability update
+        """
+        by_date = defaultdict(list)
+        for booking in page:
+            by_date[booking.get("date")].append(booking)
+        chunks = list()
+        for date, bookings in by_date.items():
+            chunk, writes = list(), 1
+            for booking in bookings:
+                booking_writes = 1 + len(booking.get("slots") or ())
+                if chunk and writes + booking_writes > MAX_WRITES_PER_COMMIT:
+                    chunks.append((date, chunk))
+                    chunk, writes = list(), 1
+                chunk.append(booking)
+                writes += booking_writes
+            chunks.append((date, chunk))
+        return chunks
+
+    def expire_chunk(self, chunk):
+        date, bookings = chunk
+        try:
+            with Metrics.timer("expiry.commit"):
+                return self.db_service.expire_pending_bookings(date, bookings)
+        except Exception as e:
+            # Left for the next run, its ttl_ts still matches
+            Logger.error(f"Failed to expire {len(bookings)} pending bookings "
+                         f"for {date} {e}", exc_info=True)
+            return None
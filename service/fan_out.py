@@ -0,0 +1,97 @@
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+
+from logger import Logger
+from metrics import Metrics
+
+# Messages per second allowed by the WhatsApp Cloud API throughput tiers
+THROUGHPUT_TIERS = {
+    "default": 80,
+    "high": 1000,
+}
+
+
+class TokenBucket:
+    """
+    Thread safe token bucket, acquire() blocks until a token is available
+    """
+
+    def __init__(self, rate: float, capacity: float = None):
+        self.rate = rate
+        self.capacity = capacity or rate
+        self.tokens = self.capacity
+        self.updated_at = time.monotonic()
+        self._lock = threading.Lock()
+
+    def acquire(self) -> None:
+        while True:
+            with self._lock:
+                now = time.monotonic()
+                self.tokens = min(self.capacity,
+                                  self.tokens + (now - self.updated_at) * self.rate)
+                self.updated_at = now
+                if self.tokens >= 1:
+                    self.tokens -= 1
+                    return
+                wait = (1 - self.tokens) / self.rate
+            time.sleep(wait)
+
+
+class FanOutReport:
+    sent: list[str]
+    failed: dict[str, str]
+    duration_ms: float
+
+    def __init__(self, sent: list[str] = None, failed: dict[str, str] = None,
+                 duration_ms: float = 0) -> None:
+        self.sent = sent or list()
+        self.failed = failed or dict()
+        self.duration_ms = duration_ms
+
+    def __str__(self):
+        return (f"sent={len(self.sent)}, failed={self.failed}, "
+                f"duration_ms={self.duration_ms:.1f}")
+
+
+class FanOutDispatcher:
+    """
+    Sends one message per recipient concurrently, rate limited to the
+    configured WhatsApp throughput tier
+    """
+
+    def __init__(self, send, concurrency: int = 8,
+                 rate_per_second: float = THROUGHPUT_TIERS["default"]):
+        self.send = send
+        self.limiter = TokenBucket(rate_per_second)
+        self.executor = ThreadPoolExecutor(max_workers=concurrency,
+                                           thread_name_prefix="fan-out")
+
+    def _send(self, message) -> bool:
+        self.limiter.acquire()
+        return self.send(message)
+
+    def dispatch(self, messages: dict) -> FanOutReport:
+        """
+        Sends messages, a dict of recipient to message, and reports the outcome
+        for every recipient
+        """
+        start = time.perf_counter()
+        futures = {recipient: self.executor.submit(self._send, message)
+                   for recipient, message in messages.items()}
+        report = FanOutReport()
+        for recipient, future in futures.items():
+            try:
+                if future.result():
+                    report.sent.append(recipient)
+                else:
+                    report.failed[recipient] = "rejected"
+            except Exception as e:
+                report.failed[recipient] = str(e)
+        report.duration_ms = (time.perf_counter() - start) * 1000
+        Metrics.increment("fan_out.sent", len(report.sent))
+        Metrics.increment("fan_out.failed", len(report.failed))
+        Metrics.timing("fan_out.dispatch", report.duration_ms)
+        if report.failed:
+            Logger.error(f"Fan out failed for {report.failed}")
+        return report
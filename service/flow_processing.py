@@ -1,3 +1,4 @@
+import asyncio
 import datetime
 from abc import abstractmethod
 from functools import cmp_to_key
@@ -10,12 +11,21 @@ from service.base_message_processor import BaseProcessor
 
 
 class FlowFactory:
-    def __init__(self, db_service):
-        self.date_screen_processor = DateScreenProcessor(db_service)
-        self.slot_screen_processor = SlotScreenProcessor(db_service)
-        self.booking_confirmation_processor = BookingConfirmationProcessor(db_service)
+    def __init__(self, db_service, catalog, async_db_service=None):
+        self.date_screen_processor = DateScreenProcessor(db_service, catalog,
+                                                         async_db_service)
+        self.slot_screen_processor = SlotScreenProcessor(db_service, catalog,
+                                                         async_db_service)
+        self.booking_confirmation_processor = BookingConfirmationProcessor(
+            db_service, catalog, async_db_service)
 
     def process(self, message, screen: Screen):
+        return self.get_processor(screen).process_flow_request(message)
+
+    async def process_async(self, message, screen: Screen):
+        return await self.get_processor(screen).process_flow_request_async(message)
+
+    def get_processor(self, screen: Screen) -> "BaseFlowRequestProcessor":
         match screen:
             case Screen.DATE_SELECTION:
                 service = self.date_screen_processor
@@ -25,41 +35,82 @@ class FlowFactory:
                 service = self.booking_confirmation_processor
             case _:
                 raise ValueError("Invalid screen")
-        return service.process_flow_request(message)
+        return service
 
 
 class BaseFlowRequestProcessor(BaseProcessor):
-    def __init__(self, db_service):
-        super().__init__(db_service)
+    """
+    Screens read the pending booking for the flow token and, where needed,
+    the reserved slots of the selected date, then build the response from
+    them. process_flow_request reads one after another through db_service,
+    process_flow_request_async reads concurrently through async_db_service.
+    """
+
+    def __init__(self, db_service, catalog, async_db_service=None):
+        super().__init__(db_service, catalog)
+        self.async_db_service = async_db_service
 
     @abstractmethod
     def process_flow_request(self, message, *args, **kwargs) -> FlowResponse:
         pass
 
+    @abstractmethod
+    async def process_flow_request_async(self, message, *args,
+                                         **kwargs) -> FlowResponse:
+        pass
+
     def exists_pending_booking(self, token):
         mobile = self.db_service.get_mobile_token_mapping(token).get(token)
         return self.db_service.get_pending_booking(mobile=mobile)
 
+    async def exists_pending_booking_async(self, token):
+        mapping = await self.async_db_service.get_mobile_token_mapping(token)
+        return await self.async_db_service.get_pending_booking(
+            mobile=mapping.get(token))
+
 
 class DateScreenProcessor(BaseFlowRequestProcessor):
 
-    def __init__(self, db_service):
-        super().__init__(db_service)
+    def __init__(self, db_service, catalog, async_db_service=None):
+        super().__init__(db_service, catalog, async_db_service)
 
     def process_flow_request(self, message, *args, **kwargs):
         date_selected = message.data.get("selected_date")
-        response = dict()
         if not date_selected:
-            response['error_messages'] = "Please select date"
-            return response, Screen.DATE_SELECTION.value
+            return self.build_response(message, None, None, None)
+        formatted_date = self.format_date(date_selected)
+        if self.exists_pending_booking(message.flow_token):
+            return self.build_response(message, formatted_date, True, None)
+        return self.build_response(message, formatted_date, False,
+                                   self.db_service.get_reserved_slots(formatted_date))
+
+    async def process_flow_request_async(self, message, *args, **kwargs):
+        date_selected = message.data.get("selected_date")
+        if not date_selected:
+            return self.build_response(message, None, None, None)
+        formatted_date = self.format_date(date_selected)
+        pending_booking, reserved_slots = await asyncio.gather(
+            self.exists_pending_booking_async(message.flow_token),
+            self.async_db_service.get_reserved_slots(formatted_date)
+        )
+        return self.build_response(message, formatted_date, pending_booking,
+                                   reserved_slots)
+
+    def format_date(self, date_selected) -> str:
         date = datetime.datetime.fromtimestamp(float(date_selected) / 1000,
                                                tz=pytz.timezone("Asia/Kolkata"))
-        formatted_date = f'{date.strftime(self.mbs.date_format)}'
+        return f'{date.strftime(self.mbs.date_format)}'
 
-        if self.exists_pending_booking(message.flow_token):
+    def build_response(self, message, formatted_date, pending_booking,
+                       reserved_slots):
+        response = dict()
+        if not formatted_date:
+            response['error_messages'] = "Please select date"
+            return response, Screen.DATE_SELECTION.value
+        if pending_booking:
             response['success'] = "false"
             return FlowResponse(data=response, screen=Screen.SUCCESS.value)
-        response['slots'] = self.get_available_slots(formatted_date)
+        response['slots'] = self.get_available_slots(formatted_date, reserved_slots)
         response['selected_date'] = formatted_date
         response['error_messages'] = ""
         response['show_error_message'] = False
@@ -68,47 +119,60 @@ class DateScreenProcessor(BaseFlowRequestProcessor):
 
 class SlotScreenProcessor(BaseFlowRequestProcessor):
 
-    def __init__(self, db_service):
-        super().__init__(db_service)
+    def __init__(self, db_service, catalog, async_db_service=None):
+        super().__init__(db_service, catalog, async_db_service)
 
     def process_flow_request(self, message, *args, **kwargs) -> FlowResponse:
+        if self.exists_pending_booking(message.flow_token):
+            return self.build_response(message, True, None)
+        return self.build_response(message, False, self.db_service.get_reserved_slots(
+            message.data.get("selected_date")))
+
+    async def process_flow_request_async(self, message, *args,
+                                         **kwargs) -> FlowResponse:
+        pending_booking, booked_slots = await asyncio.gather(
+            self.exists_pending_booking_async(message.flow_token),
+            self.async_db_service.get_reserved_slots(message.data.get("selected_date"))
+        )
+        return self.build_response(message, pending_booking, booked_slots)
+
+    def build_response(self, message, pending_booking, booked_slots) -> FlowResponse:
         date_selected = message.data.get("selected_date")
         token = message.flow_token
-        date = datetime.datetime.strptime(date_selected, self.mbs.date_format)
-        today_date = datetime.datetime.now(pytz.timezone('Asia/Kolkata'))
-        current_hour = today_date.hour
         slots_selected = message.data.get("slots")
+        slots = self.slots
         response = dict()
         error = False
-        if self.exists_pending_booking(message.flow_token):
+        if pending_booking:
             response['success'] = "false"
             return FlowResponse(data=response, screen=Screen.SUCCESS.value)
         if not slots_selected or len(slots_selected) == 0:
             error = True
             response['error_messages'] = "Please select at least 1 slot"
 
-        booked_slots = self.db_service.get_reserved_slots(date_selected)
-        for slot in slots_selected:
-            slot_details = self.slots.get(slot)
-            if booked_slots.get(slot) or (
-                    (today_date.date() == date.date()
-                     and slot_details.get("start_hour") <= current_hour
-                     and slot_details.get("start_hour") > 4)):
-                error = True
-                response[
-                    'error_messages'] = f"Slot {self.slots.get(slot).get("title")} is unavailable. Please select different slot."
-                break
+        index = self.catalog.index
+        conflicts = index.mask(slots_selected or []) & self.get_unavailable_mask(
+            date_selected, booked_slots)
+        if conflicts:
+            slot = next(slot for slot in slots_selected if index.has(conflicts, slot))
+            error = True
+            response[
+                'error_messages'] = f"Slot {slots.get(slot).get("title")} is unavailable. Please select different slot."
+        elif any(slot not in index.bits for slot in slots_selected or []):
+            # Selected from a screen rendered before the slot was deactivated
+            error = True
+            response['error_messages'] = "A selected slot is unavailable. Please select different slot."
 
         if error:
             response['selected_date'] = date_selected
             response['show_error_message'] = True
-            response['slots'] = self.get_available_slots(date_selected)
+            response['slots'] = self.get_available_slots(date_selected, booked_slots)
             return FlowResponse(data=response, screen=Screen.SLOT_SELECTION.value)
 
-        sorted_array = sorted([self.slots.get(slot) for slot in slots_selected], key=cmp_to_key(lambda x, y: x.get("sort_order") - y.get("sort_order")))
+        sorted_array = sorted([slots.get(slot) for slot in slots_selected], key=cmp_to_key(lambda x, y: x.get("sort_order") - y.get("sort_order")))
         slots_title = [slot.get("title") for slot in sorted_array]
         total_amount = sum(
-            [self.slots.get(slot).get("price") for slot in slots_selected])
+            [slots.get(slot).get("price") for slot in slots_selected])
         response['selected_date'] = f"{date_selected}"
         response['slots_title'] = f"{', '.join(slots_title)}"
         response['slots'] = f"{', '.join(slots_selected)}"
@@ -133,16 +197,25 @@ class SlotScreenProcessor(BaseFlowRequestProcessor):
 
 class BookingConfirmationProcessor(BaseFlowRequestProcessor):
 
-    def __init__(self, db_service):
-        super().__init__(db_service)
+    def __init__(self, db_service, catalog, async_db_service=None):
+        super().__init__(db_service, catalog, async_db_service)
 
     def process_flow_request(self, message, *args, **kwargs) -> FlowResponse:
+        return self.build_response(message,
+                                   self.exists_pending_booking(message.flow_token))
+
+    async def process_flow_request_async(self, message, *args,
+                                         **kwargs) -> FlowResponse:
+        return self.build_response(
+            message, await self.exists_pending_booking_async(message.flow_token))
+
+    def build_response(self, message, pending_booking) -> FlowResponse:
         date_selected = message.data.get("selected_date")
         token = message.flow_token
         slots = message.data.get("slots").split(",")
         amount = message.data.get("amount")
         response = dict()
-        if self.exists_pending_booking(message.flow_token):
+        if pending_booking:
             response['success'] = "false"
             return FlowResponse(data=response, screen=Screen.SUCCESS.value)
         response['selected_date'] = date_selected
@@ -18,10 +18,13 @@ from model.webook_text import Message as TextMessage, Text
 
 
 class MessageFactory:
-    def __init__(self, db_service, payment_service):
-        self.text_message_processor = TextMessageProcessor(db_service)
-        self.interactive_message_processor = InteractiveMessageProcessor(db_service)
-        self.nfm_reply_processor = NfmMessageProcessor(db_service, payment_service)
+    def __init__(self, db_service, catalog, payment_service, profile_store=None):
+        self.text_message_processor = TextMessageProcessor(db_service, catalog,
+                                                           profile_store)
+        self.interactive_message_processor = InteractiveMessageProcessor(db_service,
+                                                                         catalog)
+        self.nfm_reply_processor = NfmMessageProcessor(db_service, catalog,
+                                                       payment_service)
 
     def process(self, message, message_type: MessageType, *args, **kwargs):
         match message_type:
@@ -38,8 +41,8 @@ class MessageFactory:
 
 
 class BaseMessageProcessor(BaseProcessor):
-    def __init__(self, db_service):
-        super().__init__(db_service)
+    def __init__(self, db_service, catalog):
+        super().__init__(db_service, catalog)
 
     @abstractmethod
     def process_message(self, message, *args, **kwargs):
@@ -114,8 +117,9 @@ class BaseMessageProcessor(BaseProcessor):
 
 
 class TextMessageProcessor(BaseMessageProcessor):
-    def __init__(self, db_service):
-        super().__init__(db_service)
+    def __init__(self, db_service, catalog, profile_store=None):
+        super().__init__(db_service, catalog)
+        self.profile_store = profile_store or db_service
 
     def process_message(self, message, *args, **kwargs):
         if not message:
@@ -123,7 +127,7 @@ class TextMessageProcessor(BaseMessageProcessor):
         mobile = message.message_from
         contact = kwargs.get("contact")
         name = (contact and contact.get("profile") and contact.get("profile").get("name")) or ""
-        self.db_service.update_user_details(mobile, name)
+        self.profile_store.update_user_details(mobile, name)
 
         if self.is_under_maintenance(mobile):
             return
@@ -142,17 +146,21 @@ View bookings --> Get existing bookings of yesterday, today and all future days
 
 
 class InteractiveMessageProcessor(BaseMessageProcessor):
-    def __init__(self, db_service):
-        super().__init__(db_service)
+    def __init__(self, db_service, catalog):
+        super().__init__(db_service, catalog)
 
     def process_message(self, message, *args, **kwargs):
         mobile = message.message_from
         if self.is_under_maintenance(mobile):
             return
-        request_type = InteractiveRequestType(message.interactive.button_reply.id)
+        # Show more buttons carry the paging cursor after the request type
+        button_id, _, cursor = message.interactive.button_reply.id.partition(":")
+        request_type = InteractiveRequestType(button_id)
         return_message = None
         if request_type == InteractiveRequestType.VIEW_BOOKING:
             return_message = self.get_view_booking_message(mobile)
+        elif request_type == InteractiveRequestType.VIEW_BOOKING_MORE:
+            return_message = self.get_view_booking_message(mobile, cursor)
         elif request_type == InteractiveRequestType.NEW_BOOKING:
             return_message = self.get_new_booking_message(mobile)
         self.api_service.send_message_request(return_message)
@@ -174,13 +182,17 @@ class InteractiveMessageProcessor(BaseMessageProcessor):
             )
         )
 
-    def get_view_booking_message(self, mobile):
+    def get_view_booking_message(self, mobile, cursor: str = None):
         today_date = datetime.datetime.now() \
                          .replace(hour=0, minute=0, second=0, microsecond=0) \
                      - datetime.timedelta(days=1)
-        bookings = self.db_service.get_user_future_bookings(mobile, today_date)
+        bookings, next_cursor = self.db_service.get_user_future_bookings(
+            mobile, today_date,
+            int(self.secrets.get("VIEW_BOOKINGS_PAGE_SIZE") or 5),
+            start_after=cursor or None
+        )
         if not bookings or len(bookings) == 0:
-            message = "No upcoming booking found."
+            message = "No more bookings found." if cursor else "No upcoming booking found."
         else:
             message = ""
             for booking in bookings:
@@ -189,6 +201,8 @@ Date: {booking.date}
 Slots: {', '.join([slot.get("title") for slot in sorted([self.slots.get(slot) for slot in booking.slots],key = lambda x: x.get("sort_order"))])}
 Amount: {booking.amount}
 """
+        if next_cursor:
+            return self.mbs.get_view_more_bookings_message(mobile, message, next_cursor)
         return_message = self.mbs.get_final_text_message(mobile, "", message)
         return return_message
 
@@ -201,8 +215,8 @@ This class processes user message post flow screen confirmation (NFM Reply Messa
 
 
 class NfmMessageProcessor(BaseMessageProcessor):
-    def __init__(self, db_service, payment_service):
-        super().__init__(db_service)
+    def __init__(self, db_service, catalog, payment_service):
+        super().__init__(db_service, catalog)
         self.amount_offset = self.secrets.get("AMOUNT_OFFSET") or 100
         self.payment_service: BasePayment = payment_service
 
@@ -224,24 +238,15 @@ class NfmMessageProcessor(BaseMessageProcessor):
         token = response.get("token")
         slots_id = response.get("slots")
         date = response.get("selected_date")
-        sorted_array = sorted([self.slots.get(slot.strip()) for slot in slots_id.split(',')],
+        slots = self.slots
+        sorted_array = sorted([slots.get(slot.strip()) for slot in slots_id.split(',')],
                               key=cmp_to_key(lambda x, y: x.get("sort_order") - y.get(
                                   "sort_order")))
         slots_title = ", ".join([slot.get("title") for slot in sorted_array])
         total_amount = sum(
-            [self.slots.get(slot.strip()).get("price") for slot in slots_id.split(',')])
+            [slots.get(slot.strip()).get("price") for slot in slots_id.split(',')])
         Logger.info(f"Pending payment amount {total_amount}, actual amount {amount}")
         pending_booking_token = self.db_service.get_mobile_token_mapping(token)
-        confirmed_bookings = self.db_service.get_confirmed_bookings(date)
-        for booking in confirmed_bookings:
-            for slot in slots_id.split(','):
-                if slot.strip() in booking.slots:
-                    return_message = self.mbs.get_final_text_message(
-                        mobile=mobile,
-                        body=f"Sorry. One of the slot is already booked. Please start new booking."
-                    )
-                    self.api_service.send_message_request(data=return_message)
-                    return
 
         # Token expired below
         if not pending_booking_token or pending_booking_token.get(token) != mobile:
@@ -260,10 +265,16 @@ class NfmMessageProcessor(BaseMessageProcessor):
                 "Please start the booking again by sending *Hi*."
             )
         else:
-            self.db_service.create_booking(
-                mobile, token, total_amount, date,
-                [slot.strip() for slot in slots_id.split(",")]
-            )
+            if not self.db_service.create_booking(
+                    mobile, token, total_amount, date,
+                    [slot.strip() for slot in slots_id.split(",")]
+            ):
+                return_message = self.mbs.get_final_text_message(
+                    mobile=mobile,
+                    body=f"Sorry. One of the slot is already booked. Please start new booking."
+                )
+                self.api_service.send_message_request(data=return_message)
+                return
             if mobile and mobile in self.secrets.get("CBC_TEST_NUMBERS"):
                 Logger.info(f"Setting amount to {amount} for test number {mobile}")
                 total_amount = total_amount // 1000
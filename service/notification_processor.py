@@ -4,18 +4,27 @@ import pytz
 
 from logger import Logger
 from service.base_message_processor import BaseProcessor
+from service.fan_out import FanOutDispatcher, FanOutReport, THROUGHPUT_TIERS
 from model.templates import TemplateBuilder as tb
 
 
 class NotificationProcessor(BaseProcessor):
-    def __init__(self, db_service):
-        super().__init__(db_service)
+    def __init__(self, db_service, catalog):
+        super().__init__(db_service, catalog)
+        self.fan_out = FanOutDispatcher(
+            self.api_service.send_message_request,
+            concurrency=int(self.secrets.get("NOTIFICATION_CONCURRENCY") or 8),
+            rate_per_second=THROUGHPUT_TIERS.get(
+                self.secrets.get("WA_THROUGHPUT_TIER"), THROUGHPUT_TIERS["default"]
+            )
+        )
 
     """
     Send booking notification immediately 
     """
 
-    def send_payment_notifications(self, date, slots, booking_number, amount):
+    def send_payment_notifications(self, date, slots, booking_number,
+                                   amount) -> FanOutReport:
         today_date = datetime.datetime.now(pytz.timezone('Asia/Kolkata'))
         notification_date = datetime.datetime.strptime(date, self.mbs.date_format)
         new_booking_only = True
@@ -27,78 +36,88 @@ class NotificationProcessor(BaseProcessor):
         mobile_numbers = self.db_service.get_notification_eligible_numbers(
             new_booking_only
         )
-        for mobile_number in mobile_numbers:
-            self.api_service.send_message_request(
-                tb.build(
-                    mobile=mobile_number,
-                    template_name="new_booking_notification",
-                    parameters=[
-                        tb.get_text_parameter(date),
-                        tb.get_text_parameter(slots),
-                        tb.get_text_parameter(
-                            f"+{booking_number}, {self.db_service.get_user_details(booking_number) or ""}"),
-                        tb.get_text_parameter(amount),
-                    ]
-                )
+        parameters = [
+            tb.get_text_parameter(date),
+            tb.get_text_parameter(slots),
+            tb.get_text_parameter(
+                f"+{booking_number}, {self.db_service.get_user_details(booking_number) or ""}"),
+            tb.get_text_parameter(amount),
+        ]
+        report = self.fan_out.dispatch({
+            mobile_number: tb.build(
+                mobile=mobile_number,
+                template_name="new_booking_notification",
+                parameters=parameters
             )
+            for mobile_number in mobile_numbers
+        })
+        Logger.info(f"Payment notification for {booking_number}: {report}")
+        return report
 
     """
     Send daily booking notification at 6 AM, 12 noon, 6 PM 
     """
 
-    def send_scheduled_notifications(self):
+    def send_scheduled_notifications(self) -> FanOutReport:
         mobile_numbers = self.db_service.get_notification_eligible_numbers(
             new_booking_only=False
         )
         today_date = datetime.datetime.now(pytz.timezone('Asia/Kolkata'))
         formatted_date = today_date.strftime(self.mbs.date_format)
-        bookings = self.db_service.get_confirmed_bookings(formatted_date)
+        bookings = self.get_confirmed_bookings(formatted_date)
         if not bookings or len(bookings) == 0:
             final_message = "No bookings confirmed yet for today."
         else:
+            names = self.db_service.get_user_names(
+                [booking.mobile for booking in bookings])
             final_message = "    --------------------------------------------------------------    ".join(
                 [
-                    f"_*BOOKING {ind + 1}:*_ +{booking.mobile}, {self.db_service.get_user_details(booking.mobile) or ""} --> {',   '.join([slot.get("title") for slot in sorted([self.slots.get(slot) for slot in booking.slots],key = lambda x: x.get("sort_order"))])}"
+                    f"_*BOOKING {ind + 1}:*_ +{booking.mobile}, {names.get(booking.mobile) or ""} --> {',   '.join([slot.get("title") for slot in sorted([self.slots.get(slot) for slot in booking.slots],key = lambda x: x.get("sort_order"))])}"
                     for ind, booking in enumerate(bookings)
                 ])
-        for mobile_number in mobile_numbers:
-            self.api_service.send_message_request(
-                tb.build(
-                    mobile=mobile_number,
-                    template_name="scheduled_booking_notification",
-                    parameters=[
-                        tb.get_text_parameter(formatted_date),
-                        tb.get_text_parameter(final_message)
-                    ]
-                )
+        parameters = [
+            tb.get_text_parameter(formatted_date),
+            tb.get_text_parameter(final_message)
+        ]
+        report = self.fan_out.dispatch({
+            mobile_number: tb.build(
+                mobile=mobile_number,
+                template_name="scheduled_booking_notification",
+                parameters=parameters
             )
+            for mobile_number in mobile_numbers
+        })
+        Logger.info(f"Scheduled notification for {formatted_date}: {report}")
+        return report
 
     def send_upcoming_booking_notification(self):
         today_date = datetime.datetime.now(pytz.timezone('Asia/Kolkata'))
         formatted_date = today_date.strftime(self.mbs.date_format)
         hour = today_date.hour + 1
-        bookings = self.db_service.get_confirmed_bookings(formatted_date)
+        bookings = [
+            booking for booking in self.get_confirmed_bookings(formatted_date)
+            if self.slots.get(sorted(booking.slots)[0]).get("start_hour") == hour
+        ]
+        names = self.db_service.get_user_names([booking.mobile for booking in bookings])
         for booking in bookings:
-            first_slot = sorted(booking.slots)[0]
-            if self.slots.get(first_slot).get("start_hour") == hour:
-                name = self.db_service.get_user_details(booking.mobile)
-                hour_12_format = datetime.datetime.strptime(str(hour), "%H").strftime(
-                    "%I:%M %p")
-                Logger.info(f"Sending notification for upcoming booking {booking}")
-                self.api_service.send_message_request(
-                    tb.build(
-                        mobile=booking.mobile,
-                        template_name=self.secrets.get(
-                            "TEMPLATE_NAME_UPCOMING_BOOKING_NOTIFICATION"
-                        ),
-                        parameters=[
-                            tb.get_text_parameter(name),
-                            tb.get_text_parameter(f"{hour_12_format}")
+            name = names.get(booking.mobile)
+            hour_12_format = datetime.datetime.strptime(str(hour), "%H").strftime(
+                "%I:%M %p")
+            Logger.info(f"Sending notification for upcoming booking {booking}")
+            self.api_service.send_message_request(
+                tb.build(
+                    mobile=booking.mobile,
+                    template_name=self.secrets.get(
+                        "TEMPLATE_NAME_UPCOMING_BOOKING_NOTIFICATION"
+                    ),
+                    parameters=[
+                        tb.get_text_parameter(name),
+                        tb.get_text_parameter(f"{hour_12_format}")
 
-                        ],
-                        header=[tb.get_image_parameter(self.secrets.get(
-                                "IMAGE_URL_UPCOMING_BOOKING_NOTIFICATION")
-                        )
-                        ]
+                    ],
+                    header=[tb.get_image_parameter(self.secrets.get(
+                            "IMAGE_URL_UPCOMING_BOOKING_NOTIFICATION")
                     )
+                    ]
                 )
+            )
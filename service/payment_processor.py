@@ -1,4 +1,5 @@
 import base64
+import datetime
 import json
 
 from external.payment import BasePayment
@@ -10,10 +11,12 @@ from service.notification_processor import NotificationProcessor
 
 
 class PaymentProcessor(BaseProcessor):
-    def __init__(self, db_service, payment_service):
-        super().__init__(db_service)
+    def __init__(self, db_service, catalog, payment_service,
+                 notification_service: NotificationProcessor = None):
+        super().__init__(db_service, catalog)
         self.payment_service: BasePayment = payment_service
-        self.notification_service = NotificationProcessor(db_service)
+        self.notification_service = (notification_service
+                                     or NotificationProcessor(db_service, catalog))
 
     def validate_payment_response(self, header, response):
         validate_request = self.payment_service.validate_response(header, response)
@@ -30,7 +33,7 @@ class PaymentProcessor(BaseProcessor):
             mapping = self.db_service.get_mobile_token_mapping(
                 order_payload.get("receipt")
             )
-            if mapping is None:
+            if not mapping:
                 Logger.error(
                     f"No mobile token mapping found for toke {order_payload.get('receipt')}")
                 return
@@ -53,10 +56,13 @@ class PaymentProcessor(BaseProcessor):
             )
 
     def generate_payment_link(self, amount, transaction_id):
-        self.db_service.remove_pending_bookings()
         if not self.db_service.get_mobile_token_mapping(transaction_id):
             raise InvalidStateException("Invalid transaction token")
-        elif not self.db_service.get_pending_booking(token=transaction_id):
+        pending_booking = self.db_service.get_pending_booking(token=transaction_id)
+        ttl_ts = pending_booking.get("ttl_ts") if pending_booking else None
+        # Expired bookings are removed by the scheduled expiry job, bookings
+        # written without a ttl_ts are treated as expired
+        if not ttl_ts or ttl_ts < datetime.datetime.now(datetime.timezone.utc):
             raise InvalidStateException("<h1>This payment link is expired. "
                                         "Please start new booking from WhatsApp.</h1>")
         else:
@@ -103,20 +109,18 @@ class PaymentProcessor(BaseProcessor):
                     "Booking already is confirmed {}".format(
                         message,
                     ))
-            elif self.check_if_slot_unavailable(existing_booking.get("date"),
-                                                existing_booking.get("slots")):
+            elif not self.db_service.confirm_booking(existing_booking,
+                                                     message.payment.reference_id,
+                                                     json.dumps(message,
+                                                                default=lambda
+                                                                    o: o.__dict__
+                                                                )
+                                                     ):
                 Logger.error(
                     "Slot was booked while confirming this booking {}".format(
                         message,
                     ))
             else:
-                self.db_service.confirm_booking(existing_booking,
-                                                message.payment.reference_id,
-                                                json.dumps(message,
-                                                           default=lambda
-                                                               o: o.__dict__
-                                                           )
-                                                )
                 name = self.db_service.get_user_details(
                     mobile=message.recipient_id) or ""
                 self.api_service.send_message_request(
@@ -150,14 +154,6 @@ Slots: {", ".join([slot.get("title") for slot in sorted(
                 message.status))
         return "", 200
 
-    def check_if_slot_unavailable(self, date: str, slots: list) -> bool:
-        confirmed_booking_for_today = self.db_service.get_confirmed_bookings(date)
-        for booking in confirmed_booking_for_today:
-            for slot in booking.slots:
-                if slot.strip() in slots:
-                    return True
-        return False
-
     def verify_payment_link_signature(
             self,
             payment_link_id,
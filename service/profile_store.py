@@ -0,0 +1,27 @@
+import threading
+
+from metrics import Metrics
+from service.cache import LRUCache
+from service.write_behind import WriteBehind
+
+
+class ProfileWriteBehind(WriteBehind):
+    """
+    Coalesces user profile writes from inbound messages. A name equal to the
+    last one written or queued for the mobile is skipped, changed names reach
+    users/{mobile} at most flush_interval seconds after they were seen.
+    """
+
+    def __init__(self, db_service, flush_interval: float = 30,
+                 cache_size: int = 10000):
+        super().__init__("profile", db_service.update_users, flush_interval)
+        self.known_names = LRUCache(cache_size)
+        self._names_lock = threading.Lock()
+
+    def update_user_details(self, mobile: str, name: str) -> None:
+        with self._names_lock:
+            if self.known_names.get(mobile) == name:
+                Metrics.increment("profile.unchanged")
+                return
+            self.known_names.put(mobile, name)
+            self.put(mobile, name)
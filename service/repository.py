@@ -0,0 +1,283 @@
+import datetime
+import os
+import threading
+from abc import ABC, abstractmethod
+
+from message_builder_service import MessageBuilderService
+from model.enums import DBBackend
+from service.write_behind import WriteBehind
+
+PENDING_BOOKING_TTL = datetime.timedelta(minutes=7)
+FLOW_TOKEN_TTL = datetime.timedelta(days=30)
+BOOKING_HISTORY_FLUSH_INTERVAL = 5
+
+
+class RepositoryFactory:
+    _repositories = dict()
+    _lock = threading.Lock()
+
+    @staticmethod
+    def get_repository(backend: DBBackend = None):
+        """
+        Repository for the DB_BACKEND environment variable, Firestore by
+        default. Repositories are shared per process: the Firestore app is
+        initialized once, and seed data written by load tests and benchmarks
+        to the offline backends is visible to the app.
+        """
+        backend = backend or DBBackend(os.getenv("DB_BACKEND") or "firestore")
+        with RepositoryFactory._lock:
+            if backend not in RepositoryFactory._repositories:
+                RepositoryFactory._repositories[backend] = \
+                    RepositoryFactory._create_repository(backend)
+            return RepositoryFactory._repositories[backend]
+
+    @staticmethod
+    def _create_repository(backend: DBBackend) -> "BaseRepository":
+        if backend == DBBackend.FIRESTORE:
+            from service.db import DBService
+            return DBService()
+        from service.document_repository import DocumentRepository
+        from service.document_store import InMemoryStore, SqliteStore
+        if backend == DBBackend.MEMORY:
+            store = InMemoryStore()
+        else:
+            store = SqliteStore(os.getenv("DB_SQLITE_PATH") or "cbc.sqlite3")
+        return DocumentRepository(store)
+
+    @staticmethod
+    def get_async_repository(repository: "BaseRepository"):
+        """
+        Awaitable reads matching repository, Firestore's AsyncClient for
+        DBService and the repository's own reads on threads otherwise
+        """
+        from service.db import DBService
+        if isinstance(repository, DBService):
+            from service.async_db import AsyncDBService
+            return AsyncDBService()
+        from service.async_repository import ThreadedAsyncRepository
+        return ThreadedAsyncRepository(repository)
+
+
+class BaseRepository(ABC):
+    """
+    Every read and write the processors make. DBService implements it on
+    Firestore, DocumentRepository on the in-memory and SQLite stores used
+    for offline benchmarks and load tests. Booking history is derived from
+    committed bookings and appended by a write-behind queue, off the
+    booking's critical path. Entries still queued when an instance is killed
+    without shutdown, at most BOOKING_HISTORY_FLUSH_INTERVAL seconds of
+    bookings, never reach history.
+    """
+
+    def __init__(self, history_flush_interval: float = BOOKING_HISTORY_FLUSH_INTERVAL):
+        self.mbs = MessageBuilderService()
+        self.booking_history = WriteBehind("booking_history",
+                                           self.append_booking_history,
+                                           history_flush_interval)
+
+    @abstractmethod
+    def get_all_slots(self) -> (dict, dict):
+        pass
+
+    @abstractmethod
+    def watch_slots(self, callback):
+        pass
+
+    @abstractmethod
+    def watch_secrets(self, callback):
+        pass
+
+    @abstractmethod
+    def get_all_secrets(self) -> dict:
+        pass
+
+    @abstractmethod
+    def save_flow_token(self, mobile: str, token: str) -> None:
+        pass
+
+    @abstractmethod
+    def get_mobile_token_mapping(self, token: str) -> dict:
+        pass
+
+    @abstractmethod
+    def create_booking(self, mobile: str, token: str, amount: int, date: str,
+                       slots: list[int]) -> bool:
+        pass
+
+    @abstractmethod
+    def append_booking_history(self, bookings: dict[str, dict]) -> None:
+        pass
+
+    @abstractmethod
+    def confirm_booking(self, existing_booking, token, payment_response) -> bool:
+        pass
+
+    @abstractmethod
+    def get_pending_booking(self, token=None, mobile=None):
+        pass
+
+    @abstractmethod
+    def cancel_booking(self, token, mobile) -> None:
+        pass
+
+    @abstractmethod
+    def get_reserved_slots(self, date) -> dict:
+        pass
+
+    @abstractmethod
+    def shard_availability(self, date: str) -> None:
+        pass
+
+    @abstractmethod
+    def get_confirmed_bookings(self, date) -> list:
+        pass
+
+    @abstractmethod
+    def watch_confirmed_bookings(self, start: datetime.datetime,
+                                 end: datetime.datetime, callback):
+        pass
+
+    @abstractmethod
+    def get_confirmed_booking_by_token(self, token) -> list:
+        pass
+
+    @abstractmethod
+    def get_pending_bookings(self, date) -> list:
+        pass
+
+    @abstractmethod
+    def get_expired_pending_bookings(self, current_ts: datetime.datetime, limit: int,
+                                     start_after=None) -> list:
+        pass
+
+    @abstractmethod
+    def expire_pending_bookings(self, date: str, bookings: list) -> int:
+        pass
+
+    @abstractmethod
+    def get_user_future_bookings(self, mobile, date, limit: int,
+                                 start_after: str = None) -> (list, str):
+        pass
+
+    @abstractmethod
+    def get_notification_eligible_numbers(self, new_booking_only=True) -> list[str]:
+        pass
+
+    @abstractmethod
+    def update_user_details(self, mobile, name):
+        pass
+
+    @abstractmethod
+    def update_users(self, users: dict[str, str]) -> None:
+        pass
+
+    @abstractmethod
+    def get_user_details(self, mobile) -> str:
+        pass
+
+    @abstractmethod
+    def get_user_names(self, mobiles) -> dict[str, str]:
+        pass
+
+    @abstractmethod
+    def mark_event_processed(self, event_id: str, ttl: datetime.timedelta) -> bool:
+        pass
+
+    @abstractmethod
+    def remove_event_processed(self, event_id: str) -> None:
+        pass
+
+    @staticmethod
+    def index_slots(docs) -> (dict, dict):
+        slots = dict()
+        day_wise_slots: dict[int, list: dict] = dict()
+
+        for day in range(0, 7):
+            _list = list()
+            day_wise_slots[day] = _list
+
+        for doc in docs:
+            slots[doc.to_dict().get('id')] = doc.to_dict()
+            day_wise_slots.get(doc.get("day_id")).append(doc.to_dict())
+        return slots, day_wise_slots
+
+    @staticmethod
+    def generate_id(mobile: str, date: datetime.datetime = None) -> str:
+        current_ts = datetime.datetime.now()
+        if date:
+            return f'{mobile}_{date.strftime("%Y%m%d")}_{current_ts.strftime("%Y%m%d%H%M%S")}'
+        else:
+            return f'{mobile}_{current_ts.strftime("%Y%m%d%H%M%S")}'
+
+    @staticmethod
+    def flow_token_data(mobile: str, token: str) -> dict:
+        return {
+            "mobile": mobile,
+            "token": token,
+            "created_ts": datetime.datetime.now(),
+            "ttl_ts": datetime.datetime.now() + FLOW_TOKEN_TTL
+        }
+
+    def pending_booking_data(self, mobile: str, token: str, amount: int, date: str,
+                             slots: list[int]) -> dict:
+        return {
+            "mobile": mobile,
+            "token": token,
+            "created_ts": datetime.datetime.now(),
+            "amount": float(amount),
+            "date": date,
+            "actual_date": datetime.datetime.strptime(date, self.mbs.date_format),
+            "slots": sorted(slots),
+            "ttl_ts": datetime.datetime.now() + PENDING_BOOKING_TTL
+        }
+
+    @staticmethod
+    def confirmed_booking_data(existing_booking, token, payment_response) -> dict:
+        return {
+            "mobile": existing_booking.get("mobile"),
+            "token": token,
+            "created_ts": datetime.datetime.now(),
+            "amount": float(existing_booking.get("amount")),
+            "date": existing_booking.get("date"),
+            "actual_date": existing_booking.get("actual_date"),
+            "slots": sorted(existing_booking.get("slots")),
+            "cancelled": False,
+            "payment_response": payment_response
+        }
+
+    @staticmethod
+    def user_data(mobile, name) -> dict:
+        return {
+            "mobile": mobile,
+            "name": name,
+            "last_updated_ts": datetime.datetime.now()
+        }
+
+    @staticmethod
+    def availability_id(date: str) -> str:
+        return datetime.datetime.strptime(
+            date, MessageBuilderService.date_format
+        ).strftime("%Y%m%d")
+
+    @staticmethod
+    def availability_entry(state: str, token: str, mobile: str,
+                           expires_ts: datetime.datetime = None) -> dict:
+        entry = {"state": state, "token": token, "mobile": mobile}
+        if expires_ts:
+            entry["expires_ts"] = expires_ts
+        return entry
+
+    @staticmethod
+    def is_slot_held(entry: dict, current_ts: datetime.datetime,
+                     token: str = None) -> bool:
+        """
+        True when the availability entry blocks a booking: the slot is
+        confirmed, or held by an unexpired pending booking other than token
+        """
+        if not entry:
+            return False
+        if entry.get("state") == "confirmed":
+            return True
+        return (entry.get("token") != token
+                and bool(entry.get("expires_ts"))
+                and entry.get("expires_ts") > current_ts)
@@ -0,0 +1,112 @@
+import functools
+import inspect
+from contextvars import ContextVar
+
+from logger import Logger
+from metrics import Metrics
+
+_current: ContextVar["UnitOfWork"] = ContextVar("unit_of_work", default=None)
+
+
+class UnitOfWork:
+    """
+    Memoizes repository reads for one request. Reads are keyed by the
+    collections they touch and their arguments, any write to one of those
+    collections drops the cached reads. Outside a unit of work every read
+    goes to the backend.
+
+        with UnitOfWork("flow"):
+            ...
+    """
+
+    def __init__(self, name: str):
+        self.name = name
+        self.reads = 0
+        self.hits = 0
+        self._cache: dict[tuple, object] = dict()
+        self._token = None
+
+    @staticmethod
+    def current() -> "UnitOfWork":
+        return _current.get()
+
+    def __enter__(self) -> "UnitOfWork":
+        self._token = _current.set(self)
+        return self
+
+    def __exit__(self, exc_type, exc_val, exc_tb):
+        _current.reset(self._token)
+        Metrics.observe(f"repository.reads_per_request.{self.name}", self.reads)
+        Metrics.observe(f"repository.cache_hits_per_request.{self.name}", self.hits)
+        Logger.debug(f"{self.name} request made {self.reads} reads, "
+                     f"{self.hits} served from cache")
+
+    def read(self, collections: tuple, key: tuple, load):
+        if (collections, key) in self._cache:
+            self.hits += 1
+            Metrics.increment("repository.read_cache_hits")
+            return self._cache[(collections, key)]
+        self.reads += 1
+        Metrics.increment("repository.reads")
+        value = load()
+        self._cache[(collections, key)] = value
+        return value
+
+    def invalidate(self, collections: tuple) -> None:
+        self._cache = {
+            cached: value for cached, value in self._cache.items()
+            if not set(cached[0]) & set(collections)
+        }
+
+
+def cached_read(*collections):
+    """
+    Serves repeated calls with the same arguments from the current unit of
+    work
+    """
+
+    def decorator(method):
+        signature = inspect.signature(method)
+
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            unit_of_work = _current.get()
+            if unit_of_work is None:
+                Metrics.increment("repository.reads")
+                return method(self, *args, **kwargs)
+            # Same key whether arguments are passed by position or keyword
+            arguments = signature.bind(self, *args, **kwargs)
+            arguments.apply_defaults()
+            key = (method.__name__,) + tuple(arguments.arguments.items())[1:]
+            try:
+                hash(key)
+            except TypeError:
+                # Unhashable arguments, like a list of mobiles
+                key = (method.__name__, repr(key[1:]))
+            return unit_of_work.read(collections, key,
+                                     lambda: method(self, *args, **kwargs))
+
+        return wrapper
+
+    return decorator
+
+
+def invalidates(*collections):
+    """
+    Drops the current unit of work's cached reads of collections once the
+    write has run
+    """
+
+    def decorator(method):
+        @functools.wraps(method)
+        def wrapper(self, *args, **kwargs):
+            try:
+                return method(self, *args, **kwargs)
+            finally:
+                unit_of_work = _current.get()
+                if unit_of_work is not None:
+                    unit_of_work.invalidate(collections)
+
+        return wrapper
+
+    return decorator
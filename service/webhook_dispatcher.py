@@ -0,0 +1,104 @@
+import atexit
+import queue
+import threading
+import time
+from typing import Callable
+
+from logger import Logger
+from metrics import Metrics
+
+
+class WebhookEvent:
+    event_id: str
+    user: str
+    handler: Callable
+    args: tuple
+    kwargs: dict
+
+    def __init__(self, event_id: str, user: str, handler: Callable,
+                 args: tuple = (), kwargs: dict = None) -> None:
+        self.event_id = event_id
+        self.user = user
+        self.handler = handler
+        self.args = args
+        self.kwargs = kwargs or dict()
+
+
+class WebhookDispatcher:
+    """
+    Bounded in-process queue drained by a fixed pool of worker threads.
+    Webhooks are acknowledged as soon as their event is queued, the reply
+    chain (Firestore, payment links, Graph API sends) runs on a worker.
+    Queued events are drained before the process exits.
+    """
+
+    def __init__(self, workers: int = 4, max_queue_size: int = 100,
+                 drain_timeout: float = 25):
+        self.queue = queue.Queue(maxsize=max_queue_size)
+        self.drain_timeout = drain_timeout
+        self._stopped = False
+        self._workers = [
+            threading.Thread(target=self._work, name=f"webhook-worker-{i}",
+                             daemon=True)
+            for i in range(workers)
+        ]
+        for worker in self._workers:
+            worker.start()
+        atexit.register(self.shutdown)
+        Logger.info(f"Webhook dispatcher started with {workers} workers, "
+                    f"queue size {max_queue_size}")
+
+    def submit(self, handler, *args, **kwargs) -> bool:
+        """
+        Queues handler(*args, **kwargs), returns False when the event could not
+        be queued and the caller should process it inline instead
+        """
+        if self._stopped:
+            return False
+        try:
+            self.queue.put_nowait((time.monotonic(), handler, args, kwargs))
+        except queue.Full:
+            Metrics.increment("webhook.queue_full")
+            Logger.error("Webhook queue is full, processing inline")
+            return False
+        Metrics.increment("webhook.queued")
+        Metrics.gauge("webhook.queue_depth", self.queue.qsize())
+        return True
+
+    def _work(self):
+        while True:
+            item = self.queue.get()
+            if item is None:
+                self.queue.task_done()
+                return
+            enqueued_at, handler, args, kwargs = item
+            Metrics.timing("webhook.processing_lag",
+                           (time.monotonic() - enqueued_at) * 1000)
+            try:
+                with Metrics.timer("webhook.processing"):
+                    handler(*args, **kwargs)
+            except Exception as e:
+                Metrics.increment("webhook.errors")
+                Logger.error(f"Webhook processing failed {e}", exc_info=True)
+            finally:
+                self.queue.task_done()
+                Metrics.gauge("webhook.queue_depth", self.queue.qsize())
+
+    def shutdown(self):
+        """
+        Stops accepting events and waits for queued events to be processed
+        """
+        if self._stopped:
+            return
+        self._stopped = True
+        Logger.info(f"Draining {self.queue.qsize()} queued webhook events")
+        deadline = time.monotonic() + self.drain_timeout
+        for _ in self._workers:
+            try:
+                self.queue.put(None, timeout=max(0.0, deadline - time.monotonic()))
+            except queue.Full:
+                break
+        for worker in self._workers:
+            worker.join(max(0.0, deadline - time.monotonic()))
+        if self.queue.qsize():
+            Logger.error(f"Dropped {self.queue.qsize()} webhook events on shutdown")
@@ -0,0 +1,112 @@
+import atexit
+import threading
+import time
+
+from logger import Logger
+from metrics import Metrics
+from service.contention import backoff_with_jitter
+
+MAX_WRITES_PER_COMMIT = 500
+SHUTDOWN_FLUSH_ATTEMPTS = 3
+
+
+class WriteBehind:
+    """
+    Keyed writes queued off the request path and saved by a background
+    thread every flush_interval seconds, in commits of at most 500 through
+    save(dict). A later write of a queued key replaces it. Queued writes are
+    flushed before the process exits. A flush_interval of 0 saves every
+    write on the caller's thread.
+
+    Queued writes live only in memory. Those of the last flush_interval
+    seconds are lost if the process is killed without shutdown running, or
+    if the final flush still fails after SHUTDOWN_FLUSH_ATTEMPTS attempts.
+    """
+
+    def __init__(self, name: str, save, flush_interval: float = 30):
+        self.name = name
+        self.save = save
+        self.flush_interval = flush_interval
+        self._dirty: dict = dict()
+        self._lock = threading.Lock()
+        self._flush_lock = threading.Lock()
+        self._wakeup = threading.Event()
+        self._stopped = False
+        self._flusher = None
+        if flush_interval > 0:
+            self._flusher = threading.Thread(target=self._run,
+                                             name=f"{name}-flusher", daemon=True)
+            self._flusher.start()
+            atexit.register(self.shutdown)
+
+    def put(self, key, value) -> None:
+        with self._lock:
+            self._dirty[key] = value
+            pending = len(self._dirty)
+        Metrics.increment(f"{self.name}.queued")
+        Metrics.gauge(f"{self.name}.pending", pending)
+        if self._stopped or not self._flusher:
+            self.flush()
+        elif pending >= MAX_WRITES_PER_COMMIT:
+            self._wakeup.set()
+
+    def flush(self) -> int:
+        """
+        Saves the queued writes, returns the number saved. Writes of a failed
+        commit are queued again unless a newer write of the key arrived.
+        """
+        with self._flush_lock:
+            with self._lock:
+                items, self._dirty = self._dirty, dict()
+            if not items:
+                return 0
+            saved = 0
+            keys = list(items)
+            for i in range(0, len(keys), MAX_WRITES_PER_COMMIT):
+                batch = {key: items[key] for key in keys[i:i + MAX_WRITES_PER_COMMIT]}
+                try:
+                    with Metrics.timer(f"{self.name}.flush"):
+                        self.save(batch)
+                    saved += len(batch)
+                except Exception as e:
+                    Metrics.increment(f"{self.name}.failed_commits")
+                    Logger.error(f"Unable to save {len(batch)} {self.name} writes {e}")
+                    with self._lock:
+                        for key, value in batch.items():
+                            self._dirty.setdefault(key, value)
+            Metrics.increment(f"{self.name}.flushed", saved)
+            return saved
+
+    def _run(self):
+        while not self._stopped:
+            self._wakeup.wait(self.flush_interval)
+            self._wakeup.clear()
+            try:
+                self.flush()
+            except Exception as e:
+                Logger.error(f"{self.name} flush failed {e}", exc_info=True)
+
+    def shutdown(self):
+        """
+        Stops the periodic flush and saves whatever is still queued
+        """
+        if self._stopped:
+            return
+        self._stopped = True
+        self._wakeup.set()
+        if self._flusher:
+            self._flusher.join(self.flush_interval)
+        saved = self.flush()
+        for attempt in range(1, SHUTDOWN_FLUSH_ATTEMPTS):
+            if not self.pending():
+                break
+            time.sleep(backoff_with_jitter(attempt, base=0.5))
+            saved += self.flush()
+        if saved:
+            Logger.info(f"Flushed {saved} {self.name} writes on shutdown")
+        if self.pending():
+            Logger.error(f"Dropped {self.pending()} {self.name} writes on shutdown")
+
+    def pending(self) -> int:
+        with self._lock:
+            return len(self._dirty)
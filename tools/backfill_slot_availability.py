@@ -0,0 +1,101 @@
+"""
+Builds the slot_availability/{yyyymmdd} documents from existing confirmed
+and pending bookings. Dates from --from-date (default today) onwards are
+rebuilt from scratch, so the tool is safe to re-run. Dates sharded by slot
+keep their layout, their slot_availability/{yyyymmdd}/slots documents are
+rebuilt along with the date document.
+
+    GOOGLE_CLOUD_PROJECT=challenge-cricket-409510 \\
+        python -m tools.backfill_slot_availability --from-date 20250101
+"""
+import argparse
+import datetime
+
+from google.cloud.firestore_v1 import FieldFilter
+
+from logger import Logger
+from service.db import DBService
+
+BATCH_SIZE = 500
+
+
+def build_availability(db_service: DBService, from_date: datetime.datetime) -> dict:
+    availability: dict[str, dict] = dict()
+    confirmed_bookings = db_service.db.collection("confirmed_bookings").where(
+        filter=FieldFilter("actual_date", ">=", from_date)
+    ).stream()
+    for booking in confirmed_bookings:
+        b: dict = booking.to_dict()
+        if b.get("cancelled"):
+            continue
+        slots = availability.setdefault(b.get("date"), dict())
+        for slot in b.get("slots"):
+            slots[slot] = db_service.availability_entry(
+                "confirmed", b.get("token"), b.get("mobile"))
+
+    pending_bookings = db_service.db.collection("pending_bookings").where(
+        filter=FieldFilter("actual_date", ">=", from_date)
+    ).stream()
+    for booking in pending_bookings:
+        b: dict = booking.to_dict()
+        slots = availability.setdefault(b.get("date"), dict())
+        for slot in b.get("slots"):
+            if slot not in slots:
+                slots[slot] = db_service.availability_entry(
+                    "pending", b.get("token"), b.get("mobile"), b.get("ttl_ts"))
+    return availability
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawTextHelpFormatter)
+    parser.add_argument("--from-date", default=datetime.date.today().strftime("%Y%m%d"),
+                        help="first date to rebuild, yyyymmdd")
+    parser.add_argument("--dry-run", action="store_true")
+    args = parser.parse_args()
+
+    db_service = DBService()
+    from_date = datetime.datetime.strptime(args.from_date, "%Y%m%d")
+    availability = build_availability(db_service, from_date)
+    Logger.info(f"Rebuilding availability for {len(availability)} dates")
+    if args.dry_run:
+        for date, slots in sorted(availability.items()):
+            Logger.info(f"{date}: {sorted(slots)}")
+        return
+    existing = {doc.id: doc for doc in
+                db_service.db.collection("slot_availability").stream()
+                if doc.id >= args.from_date}
+    sharded_ids = {_id for _id, doc in existing.items()
+                   if (doc.to_dict() or {}).get("sharded")}
+    rebuilt = {db_service.availability_id(date): (date, slots)
+               for date, slots in availability.items()}
+    stale = [doc.reference for _id, doc in existing.items() if _id not in rebuilt]
+    writes = list()
+    for _id in sharded_ids:
+        kept = set(rebuilt[_id][1]) if _id in rebuilt else set()
+        writes += [lambda batch, ref=shard.reference: batch.delete(ref)
+                   for shard in existing[_id].reference.collection("slots").stream()
+                   if shard.id not in kept]
+    writes += [lambda batch, ref=ref: batch.delete(ref) for ref in stale]
+    for _id, (date, slots) in rebuilt.items():
+        if _id in sharded_ids:
+            writes.append(lambda batch, date=date: batch.set(
+                db_service.availability_ref(date), {"date": date, "sharded": True}))
+            writes += [lambda batch, date=date, slot=slot, entry=entry: batch.set(
+                db_service.slot_shards(date).document(slot), entry)
+                for slot, entry in slots.items()]
+        else:
+            writes.append(lambda batch, date=date, slots=slots: batch.set(
+                db_service.availability_ref(date), {"date": date, "slots": slots}))
+    Logger.info(f"Clearing {len(stale)} dates without bookings, "
+                f"{len(sharded_ids)} dates sharded by slot")
+    for start in range(0, len(writes), BATCH_SIZE):
+        batch = db_service.db.batch()
+        for write in writes[start:start + BATCH_SIZE]:
+            write(batch)
+        batch.commit()
+    Logger.info("Availability backfill complete")
+
+
+if __name__ == "__main__":
+    main()
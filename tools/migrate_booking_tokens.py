@@ -0,0 +1,44 @@
+"""
+Re-keys booking_token documents by their token. Documents written under
+the old mobile_timestamp id are copied to booking_token/{token} and the
+old document is deleted, so the tool is safe to re-run.
+
+    GOOGLE_CLOUD_PROJECT=challenge-cricket-409510 \\
+        python -m tools.migrate_booking_tokens --dry-run
+"""
+import argparse
+
+from logger import Logger
+from service.db import DBService
+
+BATCH_SIZE = 500
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__,
+                                     formatter_class=argparse.RawTextHelpFormatter)
+    parser.add_argument("--dry-run", action="store_true")
+    args = parser.parse_args()
+
+    db_service = DBService()
+    collection = db_service.db.collection("booking_token")
+    legacy = [doc for doc in collection.stream()
+              if doc.get("token") and doc.id != doc.get("token")]
+    Logger.info(f"Re-keying {len(legacy)} booking tokens")
+    if args.dry_run:
+        for doc in legacy:
+            Logger.info(f"{doc.id} -> {doc.get('token')}")
+        return
+    # Each token is a set and a delete, keep both in the same batch
+    per_batch = BATCH_SIZE // 2
+    for start in range(0, len(legacy), per_batch):
+        batch = db_service.db.batch()
+        for doc in legacy[start:start + per_batch]:
+            batch.set(collection.document(doc.get("token")), doc.to_dict())
+            batch.delete(doc.reference)
+        batch.commit()
+    Logger.info("Booking token migration complete")
+
+
+if __name__ == "__main__":
+    main()